@@ -0,0 +1,75 @@
+import random
+from typing import Iterator
+
+from generators import ProductData
+
+# Product lines and colorways modelled on the notebook product lists,
+# where a handful of product lines come in many colorways and every
+# product is stocked a few times.
+PRODUCT_LINES = [
+    ("DB", "Dragonscale Dice Bag", 250),
+    ("KC", "Octopus Keychain", 100),
+    ("AC", "Bottle Holder", 250),
+    ("EP", "Chainmail Earrings with Glass Beads", 150),
+    ("BR", "Byzantine Bracelet", 300),
+    ("NL", "Scale Maille Necklace with Matching Pendant", 450),
+]
+COLORWAYS = [
+    "Rainbow/Black",
+    "Bi Pride/Black",
+    "Trans Pride",
+    "Ace Pride",
+    "Lesbian Pride",
+    "Galaxy",
+    "Northern Lights",
+    "Black/Silver",
+    "Purple Haze",
+    "Ocean",
+    "Forest Green & Gold",
+    "Sunset",
+]
+
+
+def synthetic_catalog(tags: int, seed: int = 0) -> list[ProductData]:
+    """Generates a catalog with the given total quantity of tags.
+
+    Arguments:
+        tags: The total quantity over all products.
+        seed: The seed of the random generator.
+
+    Returns:
+        The products.
+    """
+    rng = random.Random(seed)
+    products = []
+    remaining = tags
+    for n in range(tags):
+        if remaining == 0:
+            break
+        prefix, subtitle, price = rng.choice(PRODUCT_LINES)
+        quantity = min(remaining, rng.randint(1, 6))
+        products.append(
+            {
+                "sku": f"{prefix}{n:05d}",
+                "title": rng.choice(COLORWAYS),
+                "subtitle": subtitle,
+                "price": price,
+                "quantity": quantity,
+            }
+        )
+        remaining -= quantity
+    return products
+
+
+def catalog_tags(products: list[ProductData]) -> Iterator[ProductData]:
+    """Expands a catalog by quantity, one product per tag.
+
+    Arguments:
+        products: The products.
+
+    Yields:
+        The product of every tag.
+    """
+    for product in products:
+        for _ in range(product["quantity"]):
+            yield product
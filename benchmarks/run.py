@@ -0,0 +1,279 @@
+import json
+import multiprocessing
+import os
+import platform
+import resource
+import subprocess
+import sys
+import tempfile
+import time
+from concurrent.futures import ProcessPoolExecutor
+from io import BytesIO
+from typing import Callable, TypedDict
+
+import typer
+from reportlab.lib.units import mm
+from typing_extensions import Annotated
+
+from generators import (
+    ProductData,
+    generate_backing_cards,
+    generate_price_tags,
+    generate_qrcode,
+    register_fonts,
+)
+from generators.pdf import FONTS, URL_FORMAT_QR
+from generators.text import PRICE_TAG_TEXT, find_max_fontsize, line_wrap_text
+
+from .catalogs import catalog_tags, synthetic_catalog
+
+SIZES = [10, 1_000, 100_000]
+BASELINE_FILE = "benchmarks/baseline.json"
+
+# The text width of a default price tag.
+LINE_WIDTH = 26 * mm
+
+# Relative increase over the baseline at which a metric is flagged.
+THRESHOLDS = {"wall_time": 0.2, "peak_rss": 0.2, "output_size": 0.05}
+
+
+# The maximum startup time in seconds of commands run from shell
+# scripts, as the fastest of several runs.
+STARTUP_BUDGETS = {
+    "import generators": ([sys.executable, "-c", "import generators"], 0.15),
+    "main.py --help": ([sys.executable, "main.py", "--help"], 0.4),
+}
+
+
+class BenchmarkResult(TypedDict):
+    benchmark: str
+    tags: int
+    items: int
+    wall_time: float
+    per_item: float
+    peak_rss: int
+    output_size: int | None
+
+
+def bench_price_tags(products: list[ProductData], directory: str) -> tuple[int, str]:
+    filename = os.path.join(directory, "price-tags.pdf")
+    generate_price_tags(filename, products)
+    return sum(product["quantity"] for product in products), filename
+
+
+def bench_backing_cards(products: list[ProductData], directory: str) -> tuple[int, str]:
+    filename = os.path.join(directory, "backing-cards.pdf")
+    generate_backing_cards(filename, products)
+    return sum(product["quantity"] for product in products), filename
+
+
+def bench_qrcode(products: list[ProductData], directory: str) -> tuple[int, None]:
+    # Only unique SKUs, since a QR code is generated once per product.
+    for product in products:
+        generate_qrcode(BytesIO(), URL_FORMAT_QR.format(sku=product["sku"].lower()))
+    return len(products), None
+
+
+def bench_line_wrap_text(
+    products: list[ProductData], directory: str
+) -> tuple[int, None]:
+    register_fonts(*FONTS)
+    items = 0
+    for product in catalog_tags(products):
+        line_wrap_text(
+            product["subtitle"],
+            PRICE_TAG_TEXT["subtitle_font"],
+            PRICE_TAG_TEXT["subtitle_fontsize"],
+            LINE_WIDTH,
+        )
+        items += 1
+    return items, None
+
+
+def bench_find_max_fontsize(
+    products: list[ProductData], directory: str
+) -> tuple[int, None]:
+    register_fonts(*FONTS)
+    items = 0
+    for product in catalog_tags(products):
+        find_max_fontsize(
+            product["title"],
+            PRICE_TAG_TEXT["title_font"],
+            LINE_WIDTH,
+            starting_fontsize=PRICE_TAG_TEXT["title_fontsize"],
+        )
+        items += 1
+    return items, None
+
+
+BENCHMARKS: dict[str, Callable[[list[ProductData], str], tuple[int, str | None]]] = {
+    "generate_price_tags": bench_price_tags,
+    "generate_backing_cards": bench_backing_cards,
+    "generate_qrcode": bench_qrcode,
+    "line_wrap_text": bench_line_wrap_text,
+    "find_max_fontsize": bench_find_max_fontsize,
+}
+
+
+def run_benchmark(name: str, tags: int) -> BenchmarkResult:
+    """Runs one benchmark on a synthetic catalog. This is meant to run
+    in a fresh process, so that caches start cold and the peak memory
+    belongs to this benchmark alone.
+
+    Arguments:
+        name: The name of the benchmark, as listed in BENCHMARKS.
+        tags: The total quantity of tags in the catalog.
+
+    Returns:
+        The measurements.
+    """
+    products = synthetic_catalog(tags)
+    with tempfile.TemporaryDirectory() as directory:
+        start = time.perf_counter()
+        items, filename = BENCHMARKS[name](products, directory)
+        wall_time = time.perf_counter() - start
+        output_size = os.path.getsize(filename) if filename else None
+
+    # ru_maxrss is in kilobytes on Linux but in bytes on macOS.
+    peak_rss = resource.getrusage(resource.RUSAGE_SELF).ru_maxrss
+    if sys.platform != "darwin":
+        peak_rss *= 1024
+
+    return {
+        "benchmark": name,
+        "tags": tags,
+        "items": items,
+        "wall_time": wall_time,
+        "per_item": wall_time / items if items else 0.0,
+        "peak_rss": peak_rss,
+        "output_size": output_size,
+    }
+
+
+def run_isolated(name: str, tags: int, repeat: int) -> BenchmarkResult:
+    """Runs a benchmark in fresh processes and keeps the fastest run.
+
+    Arguments:
+        name: The name of the benchmark.
+        tags: The total quantity of tags in the catalog.
+        repeat: The number of runs.
+
+    Returns:
+        The measurements of the fastest run.
+    """
+    results = []
+    for _ in range(repeat):
+        with ProcessPoolExecutor(
+            max_workers=1, mp_context=multiprocessing.get_context("spawn")
+        ) as executor:
+            results.append(executor.submit(run_benchmark, name, tags).result())
+    return min(results, key=lambda result: result["wall_time"])
+
+
+def load_results(filename: str) -> dict[tuple[str, int], BenchmarkResult]:
+    with open(filename) as f:
+        data = json.load(f)
+    return {(result["benchmark"], result["tags"]): result for result in data["results"]}
+
+
+app = typer.Typer()
+
+
+@app.command()
+def run(
+    output_file: Annotated[str, typer.Option("--output", "-o")] = "results.json",
+    update_baseline: Annotated[
+        bool,
+        typer.Option(help=f"Write the results to {BASELINE_FILE} instead."),
+    ] = False,
+    benchmarks: Annotated[
+        list[str], typer.Option("--benchmark", "-b", help="Defaults to all.")
+    ] = [],  # noqa: B006
+    sizes: Annotated[list[int], typer.Option("--size", "-s")] = SIZES,  # noqa: B006
+    repeat: int = 1,
+):
+    """Runs the benchmarks and writes the results to a JSON file."""
+    results = []
+    for name in benchmarks or BENCHMARKS:
+        if name not in BENCHMARKS:
+            raise typer.BadParameter(f"Unknown benchmark {name!r}")
+        for tags in sizes:
+            result = run_isolated(name, tags, repeat)
+            results.append(result)
+            print(
+                f"{name:24} {tags:>7} tags {result['wall_time']:9.3f} s"
+                f" {result['per_item'] * 1e3:9.4f} ms/item"
+                f" {result['peak_rss'] / 2**20:8.1f} MiB",
+                flush=True,
+            )
+
+    if update_baseline:
+        output_file = BASELINE_FILE
+    with open(output_file, "w") as f:
+        json.dump(
+            {
+                "python": platform.python_version(),
+                "machine": platform.machine(),
+                "cpus": os.cpu_count(),
+                "results": results,
+            },
+            f,
+            indent=2,
+        )
+        f.write("\n")
+
+
+@app.command()
+def compare(
+    results_file: str,
+    baseline_file: Annotated[str, typer.Option("--baseline")] = BASELINE_FILE,
+):
+    """Compares benchmark results with a baseline and exits with an
+    error if any metric regressed by more than its threshold."""
+    baseline = load_results(baseline_file)
+    regressions = 0
+    for key, result in load_results(results_file).items():
+        if key not in baseline:
+            print(f"{key[0]:24} {key[1]:>7} tags  no baseline")
+            continue
+
+        for metric, threshold in THRESHOLDS.items():
+            old, new = baseline[key][metric], result[metric]
+            if not old or new is None:
+                continue
+            change = new / old - 1
+            flag = ""
+            if change > threshold:
+                flag = "  REGRESSION"
+                regressions += 1
+            print(f"{key[0]:24} {key[1]:>7} tags  {metric:12} {change:+8.1%}{flag}")
+
+    if regressions:
+        print(f"{regressions} regression(s)")
+        raise typer.Exit(1)
+
+
+@app.command()
+def startup(repeat: int = 5):
+    """Times the startup of the CLI and of importing the generators, and
+    exits with an error if any of them is over its budget."""
+    over_budget = 0
+    for name, (command, budget) in STARTUP_BUDGETS.items():
+        times = []
+        for _ in range(repeat):
+            start = time.perf_counter()
+            subprocess.run(command, check=True, capture_output=True)
+            times.append(time.perf_counter() - start)
+
+        flag = ""
+        if min(times) > budget:
+            flag = "  OVER BUDGET"
+            over_budget += 1
+        print(f"{name:24} {min(times):7.3f} s  budget {budget:5.2f} s{flag}")
+
+    if over_budget:
+        raise typer.Exit(1)
+
+
+if __name__ == "__main__":
+    app()
@@ -1,9 +1,61 @@
-from .pdf import ProductData, generate_backing_cards, generate_price_tags
-from .qr_codes import generate_qrcode
+import importlib
+from typing import TYPE_CHECKING
+
+if TYPE_CHECKING:
+    from .assets import compile_assets
+    from .fonts import register_font, register_fonts
+    from .measure import measure_catalog
+    from .pdf import generate_backing_cards, generate_price_tags
+    from .products import ProductData, RowError, read_products, read_products_file
+    from .profiling import Profiler, format_report
+    from .qr_codes import generate_qrcode
+    from .session import RenderSession
+
+# The submodules pull in reportlab, svglib, pypdf, qrcode and numpy, so
+# they are only imported once one of their names is first used.
+_EXPORTS = {
+    "ProductData": ".products",
+    "Profiler": ".profiling",
+    "RenderSession": ".session",
+    "RowError": ".products",
+    "compile_assets": ".assets",
+    "format_report": ".profiling",
+    "generate_backing_cards": ".pdf",
+    "generate_price_tags": ".pdf",
+    "generate_qrcode": ".qr_codes",
+    "measure_catalog": ".measure",
+    "read_products": ".products",
+    "read_products_file": ".products",
+    "register_font": ".fonts",
+    "register_fonts": ".fonts",
+}
 
 __all__ = [
     "ProductData",
+    "Profiler",
+    "RenderSession",
+    "RowError",
+    "compile_assets",
+    "format_report",
     "generate_backing_cards",
     "generate_price_tags",
     "generate_qrcode",
+    "measure_catalog",
+    "read_products",
+    "read_products_file",
+    "register_font",
+    "register_fonts",
 ]
+
+
+def __getattr__(name: str):
+    if name not in _EXPORTS:
+        raise AttributeError(f"module {__name__!r} has no attribute {name!r}")
+
+    value = getattr(importlib.import_module(_EXPORTS[name], __name__), name)
+    globals()[name] = value
+    return value
+
+
+def __dir__() -> list[str]:
+    return sorted({*globals(), *__all__})
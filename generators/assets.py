@@ -0,0 +1,316 @@
+import hashlib
+import os
+import pickle
+from pathlib import Path
+from typing import Iterator, NamedTuple
+
+import reportlab
+import svglib
+from reportlab.graphics import renderPDF
+from reportlab.graphics.shapes import Drawing, Group, mmult, transformPoint
+from reportlab.lib.units import mm
+from svglib.svglib import (
+    LinearGradientShape,
+    RadialGradientShape,
+    SvgRenderer,
+    load_svg_file,
+)
+
+from .cache import cached
+from .profiling import profiled
+
+CACHE_DIR = ".cache/assets"
+# Changed whenever the conversion itself changes, so that assets compiled
+# by an earlier version are rebuilt.
+COMPILER_VERSION = 2
+
+LOGO_FILE = "assets/logo/cfc-logo-grey.svg"
+TEMPLATE_FILES = {
+    "backing-cards-front": "assets/templates/backing-cards.svg",
+    "backing-cards-back": "assets/templates/backing-cards-back.svg",
+}
+
+IDENTITY = (1, 0, 0, 1, 0, 0)
+
+
+class CardGrid(NamedTuple):
+    """The layout of the cards on a sheet, in points. The position of
+    the top left card is measured from the top left corner of the page.
+    """
+
+    left: float
+    top: float
+    width: float
+    height: float
+    gap: float
+    columns: int
+    rows: int
+
+    def cards(self, pageheight: float) -> list[tuple[float, float, float, float]]:
+        """Computes the bounds of the cards, row by row.
+
+        Arguments:
+            pageheight: The height of the page.
+
+        Returns:
+            The left, bottom, right and top edge of each card, measured
+            from the bottom left corner of the page.
+        """
+        bounds = []
+        for row in range(self.rows):
+            top = pageheight - self.top - (self.height + self.gap) * row
+            for column in range(self.columns):
+                left = self.left + (self.width + self.gap) * column
+                bounds.append((left, top - self.height, left + self.width, top))
+        return bounds
+
+
+# The cards the backing card templates are drawn for.
+BACKING_CARD_GRID = CardGrid(
+    left=23.5 * mm,
+    top=19 * mm,
+    width=53 * mm,
+    height=85 * mm,
+    gap=2 * mm,
+    columns=3,
+    rows=3,
+)
+
+
+def asset_hash(filename: str) -> str:
+    """Hashes the content of an asset together with the versions of the
+    libraries used to compile it, so that compiled assets are rebuilt
+    whenever either of them changes.
+
+    Arguments:
+        filename: The name of the asset file.
+
+    Returns:
+        The hex digest of the hash.
+    """
+    digest = hashlib.sha256()
+    digest.update(
+        f"reportlab={reportlab.Version};svglib={svglib.__version__};"
+        f"compiler={COMPILER_VERSION};".encode()
+    )
+    digest.update(Path(filename).read_bytes())
+    return digest.hexdigest()
+
+
+def cached_asset_path(filename: str, suffix: str) -> Path:
+    """Finds the path of the compiled version of an asset in the cache.
+
+    Arguments:
+        filename: The name of the asset file.
+        suffix: The file suffix of the compiled asset.
+
+    Returns:
+        The path of the compiled asset, which may not exist yet.
+    """
+    return (
+        Path(CACHE_DIR) / f"{Path(filename).stem}-{asset_hash(filename)[:16]}{suffix}"
+    )
+
+
+def write_atomically(path: Path, data: bytes):
+    """Writes a file such that concurrent readers either see the whole
+    file or no file at all.
+
+    Arguments:
+        path: The path of the file.
+        data: The content of the file.
+    """
+    path.parent.mkdir(parents=True, exist_ok=True)
+    temporary_path = path.with_name(f"{path.name}.{os.getpid()}.tmp")
+    temporary_path.write_bytes(data)
+    os.replace(temporary_path, path)
+
+
+class _SvgRenderer(SvgRenderer):
+    """The svglib renderer, with two fixes to gradient fills. svglib
+    paints the gradient of a shape with a transform attribute without
+    the transform, i.e. in the wrong place, and ignores the
+    gradientTransform attribute of gradients.
+    """
+
+    def renderGradient(self, node):
+        super().renderGradient(node)
+        gradient = self.gradient_defs.get(node.attrib.get("id"))
+        if gradient is not None and "gradientTransform" in node.attrib:
+            gradient["gradientTransform"] = node.attrib["gradientTransform"]
+
+    def _resolve_gradient(self, grad_id):
+        gradient = super()._resolve_gradient(grad_id)
+        if (
+            gradient is None
+            or gradient["type"] != "linear"
+            or "gradientTransform" not in gradient
+        ):
+            return gradient
+
+        group = Group()
+        self.shape_converter.applyTransformOnGroup(gradient["gradientTransform"], group)
+        a, b, c, d, e, f = group.transform
+        x1, y1 = gradient.get("x1", 0.0), gradient.get("y1", 0.0)
+        dx, dy = gradient.get("x2", 1.0) - x1, gradient.get("y2", 0.0) - y1
+        determinant = a * d - b * c
+        if determinant == 0 or dx == dy == 0:
+            return gradient
+        # A linear gradient has the same color on every line at right
+        # angles to its axis. A transform that skews these lines needs an
+        # axis at right angles to the skewed lines rather than the
+        # transformed axis.
+        nx = (d * dx - b * dy) / determinant
+        ny = (a * dy - c * dx) / determinant
+        length = (dx * dx + dy * dy) / (nx * nx + ny * ny)
+        x1, y1 = a * x1 + c * y1 + e, b * x1 + d * y1 + f
+        return {
+            **gradient,
+            "x1": x1,
+            "y1": y1,
+            "x2": x1 + nx * length,
+            "y2": y1 + ny * length,
+        }
+
+    def _apply_gradient_fill(self, item, grad_def):
+        if not isinstance(item, Group) or tuple(item.transform) == IDENTITY:
+            return super()._apply_gradient_fill(item, grad_def)
+        # The gradient is painted inside the bounds of the shape, so both
+        # are transformed together.
+        transform, item.transform = item.transform, IDENTITY
+        filled = super()._apply_gradient_fill(item, grad_def)
+        filled.transform = transform
+        return filled
+
+
+def load_svg(filename: str) -> Drawing:
+    """Converts an SVG file into a reportlab drawing.
+
+    Arguments:
+        filename: The name of the SVG file.
+
+    Returns:
+        The drawing.
+    """
+    return _SvgRenderer(filename).render(load_svg_file(filename))
+
+
+def gradient_fills(
+    node, transform=IDENTITY
+) -> Iterator[tuple[float, float, float, float]]:
+    """Finds the areas of a drawing filled with a gradient, e.g. the
+    card backgrounds of a template.
+
+    Arguments:
+        node: The drawing, or a shape in it.
+        transform: The transform of the group around the shape.
+
+    Yields:
+        The left, bottom, right and top edge of each area, on the page.
+    """
+    if isinstance(node, Group):
+        transform = mmult(transform, node.transform)
+        for child in node.contents:
+            yield from gradient_fills(child, transform)
+    elif isinstance(node, (LinearGradientShape, RadialGradientShape)):
+        x0, y0, x1, y1 = node.getBounds()
+        corners = [
+            transformPoint(transform, point)
+            for point in ((x0, y0), (x0, y1), (x1, y0), (x1, y1))
+        ]
+        xs = [x for x, _ in corners]
+        ys = [y for _, y in corners]
+        yield min(xs), min(ys), max(xs), max(ys)
+
+
+def check_card_grid(filename: str, drawing: Drawing, grid: CardGrid):
+    """Checks that a template has a card background filled with a
+    gradient in the place of every card of a grid.
+
+    Arguments:
+        filename: The name of the template, for the error message.
+        drawing: The converted template.
+        grid: The cards the template is drawn for.
+
+    Raises:
+        ValueError: If a card background is missing or misplaced.
+    """
+    tolerance = 0.1 * mm
+    fills = list(gradient_fills(drawing))
+    for number, card in enumerate(grid.cards(drawing.height), 1):
+        if not any(
+            all(
+                abs(edge - card_edge) <= tolerance
+                for edge, card_edge in zip(fill, card, strict=True)
+            )
+            for fill in fills
+        ):
+            raise ValueError(
+                f"{filename} has no card background where card {number} is,"
+                f" {card[0] / mm:.1f} mm from the left and"
+                f" {(drawing.height - card[3]) / mm:.1f} mm from the top"
+            )
+
+
+@profiled("svg parsing")
+def compile_template(filename: str, grid: CardGrid | None = None) -> str:
+    """Converts an SVG template into a single page PDF that can be
+    stamped onto other pages. The PDF is kept in the asset cache and
+    only rebuilt when the SVG changes.
+
+    Arguments:
+        filename: The name of the SVG file.
+        grid: The cards the template is drawn for. If given, the card
+            backgrounds are checked to line up with them before the PDF
+            is kept.
+
+    Returns:
+        The name of the compiled PDF file.
+    """
+    path = cached_asset_path(filename, ".pdf")
+    if not path.exists():
+        drawing = load_svg(filename)
+        if grid is not None:
+            check_card_grid(filename, drawing, grid)
+        write_atomically(path, renderPDF.drawToString(drawing))
+    return str(path)
+
+
+@cached("drawings", maxsize=16)
+def _compiled_drawing(path: Path, filename: str) -> bytes:
+    if not path.exists():
+        write_atomically(path, pickle.dumps(load_svg(filename)))
+    return path.read_bytes()
+
+
+@profiled("svg parsing")
+def load_drawing(filename: str) -> Drawing:
+    """Loads an SVG file as a reportlab drawing. The parsed drawing is
+    pickled into the asset cache and only parsed again when the SVG
+    changes. Every call returns a fresh copy that can be scaled or
+    otherwise modified freely.
+
+    Arguments:
+        filename: The name of the SVG file.
+
+    Returns:
+        The drawing.
+    """
+    return pickle.loads(
+        _compiled_drawing(cached_asset_path(filename, ".pickle"), filename)
+    )
+
+
+def compile_assets() -> list[str]:
+    """Compiles all templates and the logo into the asset cache.
+
+    Returns:
+        The names of the compiled files.
+    """
+    compiled = [
+        compile_template(filename, BACKING_CARD_GRID)
+        for filename in TEMPLATE_FILES.values()
+    ]
+    load_drawing(LOGO_FILE)
+    compiled.append(str(cached_asset_path(LOGO_FILE, ".pickle")))
+    return compiled
@@ -0,0 +1,239 @@
+import inspect
+import time
+import tomllib
+from concurrent.futures import ProcessPoolExecutor
+from pathlib import Path
+from typing import Iterable, Iterator, TypedDict
+
+from .pdf import generate_backing_cards, generate_price_tags
+from .products import RowError, read_products_file
+from .profiling import Profiler
+from .session import RenderSession
+
+JOB_KINDS = ("price_tags", "backing_cards")
+
+# Options holding paths, which are relative to the manifest.
+PATH_OPTIONS = ("cache_dir",)
+
+
+class BatchJob(TypedDict):
+    kind: str
+    input: str
+    output: str
+    options: dict
+
+
+class JobResult(TypedDict):
+    job: BatchJob
+    seconds: float
+    tags: int
+    pages: int
+    bad_rows: list[str]
+    # Why the job failed, or None if it succeeded.
+    error: str | None
+
+
+def job_options(kind: str) -> set[str]:
+    """Lists the options a kind of job accepts, i.e. the keyword
+    arguments of its generator.
+
+    Arguments:
+        kind: The kind of job.
+
+    Returns:
+        The names of the options.
+    """
+    generator = {
+        "price_tags": generate_price_tags,
+        "backing_cards": generate_backing_cards,
+    }[kind]
+    parameters = set(inspect.signature(generator).parameters)
+    return parameters - {"output", "products", "profiler"}
+
+
+def load_manifest(filename: str) -> list[BatchJob]:
+    """Reads the jobs of a batch from a TOML manifest. Every [[jobs]]
+    table names its kind ("price_tags" or "backing_cards"), its input
+    CSV and its output PDF. Any other keys are passed on to the
+    generator. Defaults for all jobs go in an optional [defaults] table,
+    where options only some kinds accept are passed to those kinds, and
+    defaults for one kind in e.g. [defaults.backing_cards]. Relative
+    paths, including cache_dir, are relative to the manifest.
+
+    Arguments:
+        filename: The name of the manifest.
+
+    Returns:
+        The jobs.
+    """
+    with open(filename, "rb") as f:
+        manifest = tomllib.load(f)
+
+    directory = Path(filename).parent
+    defaults = manifest.get("defaults", {})
+    shared_defaults = {
+        key: value for key, value in defaults.items() if key not in JOB_KINDS
+    }
+    jobs = []
+    for n_job, table in enumerate(manifest.get("jobs", []), start=1):
+        merged = {**shared_defaults, **table}
+        missing = [key for key in ("kind", "input", "output") if key not in merged]
+        if missing:
+            raise ValueError(
+                f"Job {n_job} in {filename} is missing {', '.join(missing)}"
+            )
+        kind = merged["kind"]
+        if kind not in JOB_KINDS:
+            raise ValueError(f"Job {n_job} in {filename} has unknown kind {kind!r}")
+
+        # Shared defaults only go to the kinds that accept them, while
+        # options set for a kind or a job have to be accepted.
+        accepted = job_options(kind)
+        explicit = {
+            key: value
+            for key, value in {**defaults.get(kind, {}), **table}.items()
+            if key not in ("kind", "input", "output")
+        }
+        unknown = sorted(key for key in explicit if key not in accepted)
+        if unknown:
+            raise ValueError(
+                f"Job {n_job} in {filename} has unknown options {', '.join(unknown)}"
+            )
+        options = {
+            key: value for key, value in shared_defaults.items() if key in accepted
+        }
+        options.update(explicit)
+        for key in PATH_OPTIONS:
+            if options.get(key) is not None:
+                options[key] = str(directory / options[key])
+
+        jobs.append(
+            {
+                "kind": kind,
+                "input": str(directory / merged["input"]),
+                "output": str(directory / merged["output"]),
+                "options": options,
+            }
+        )
+    return jobs
+
+
+def jobs_from_directory(
+    directory: str, kinds: Iterable[str] = JOB_KINDS, output_dir: str | None = None
+) -> list[BatchJob]:
+    """Creates a job of each kind for every CSV file in a directory,
+    writing e.g. booth-a.csv to booth-a-price-tags.pdf.
+
+    Arguments:
+        directory: The directory of the CSV files.
+        kinds: The kinds of documents to generate.
+        output_dir: The directory of the PDFs, by default the directory
+            of the CSV files.
+
+    Returns:
+        The jobs.
+    """
+    output_path = Path(output_dir if output_dir is not None else directory)
+    return [
+        {
+            "kind": kind,
+            "input": str(input_file),
+            "output": str(
+                output_path / f"{input_file.stem}-{kind.replace('_', '-')}.pdf"
+            ),
+            "options": {},
+        }
+        for input_file in sorted(Path(directory).glob("*.csv"))
+        for kind in kinds
+    ]
+
+
+def run_job(job: BatchJob, session: RenderSession) -> JobResult:
+    """Runs a single job. Rows of the input that cannot be converted are
+    skipped and listed in the result. A job that fails, e.g. because its
+    input is missing, is reported in the result instead of raising, so
+    that it does not stop the other jobs of a batch.
+
+    Arguments:
+        job: The job.
+        session: The session whose caches the job uses.
+
+    Returns:
+        The time the job took, the number of tags and pages it
+        produced, its bad rows and the error it failed with.
+    """
+    bad_rows = []
+
+    def report_bad_row(error: RowError):
+        bad_rows.append(f"{job['input']}:{error.line_number}: {error.message}")
+
+    profiler = Profiler()
+    start = time.perf_counter()
+    error = None
+    try:
+        # Opening the input checks its header before the output is
+        # touched.
+        products = read_products_file(job["input"], on_error=report_bad_row)
+        Path(job["output"]).parent.mkdir(parents=True, exist_ok=True)
+        generate = getattr(session, job["kind"])
+        generate(job["output"], products, profiler=profiler, **job["options"])
+    except Exception as exception:
+        error = f"{type(exception).__name__}: {exception}"
+    counters = profiler.report()["counters"]
+    return {
+        "job": job,
+        "seconds": time.perf_counter() - start,
+        "tags": counters.get("tags", 0),
+        "pages": counters.get("pages", 0),
+        "bad_rows": bad_rows,
+        "error": error,
+    }
+
+
+# The session of a worker process, shared by all jobs it runs.
+_worker_session: RenderSession | None = None
+
+
+def _run_in_worker(job: BatchJob) -> JobResult:
+    global _worker_session
+    if _worker_session is None:
+        _worker_session = RenderSession()
+    return run_job(job, _worker_session)
+
+
+def run_batch(
+    jobs: list[BatchJob],
+    workers: int | None = None,
+    session: RenderSession | None = None,
+) -> Iterator[JobResult]:
+    """Runs many jobs in one process with a shared session, or spread
+    over a pool of worker processes that each keep a session for all
+    the jobs they run.
+
+    Arguments:
+        jobs: The jobs.
+        workers: The number of worker processes.
+        session: The session to use without worker processes, by
+            default a new one.
+
+    Yields:
+        The result of each job, in the order of the jobs.
+    """
+    if workers is None or workers <= 1:
+        session = session if session is not None else RenderSession()
+        for job in jobs:
+            yield run_job(job, session)
+        return
+
+    with ProcessPoolExecutor(max_workers=workers) as executor:
+        yield from executor.map(_run_in_worker, jobs)
+
+
+def format_result(result: JobResult) -> str:
+    job = result["job"]
+    if result["error"] is not None:
+        return f"{job['output']:40} {job['kind']:14} failed: {result['error']}"
+    return (
+        f"{job['output']:40} {job['kind']:14} {result['tags']:>7} tags"
+        f" {result['pages']:>5} pages {result['seconds']:8.3f} s"
+    )
@@ -0,0 +1,197 @@
+import sys
+import threading
+from collections import OrderedDict
+from contextlib import contextmanager
+from contextvars import ContextVar
+from functools import wraps
+from typing import Callable, Hashable, Iterator, TypedDict
+
+_KWARGS = object()
+
+# The default size limit of each named cache, filled in by cached.
+CACHE_SIZES: dict[str, int | None] = {}
+
+
+class CacheStats(TypedDict):
+    entries: int
+    maxsize: int | None
+    hits: int
+    misses: int
+    hit_rate: float
+    memory: int
+
+
+class LRUCache:
+    """A mapping that keeps at most maxsize entries, evicting the least
+    recently used one first, and counts its hits and misses. It can be
+    shared by several threads. Like functools.lru_cache, it does not
+    hold its lock while a value is computed, so threads that miss the
+    same key at once may each compute it.
+    """
+
+    def __init__(self, maxsize: int | None = None):
+        self.maxsize = maxsize
+        self.entries = OrderedDict()
+        self.hits = 0
+        self.misses = 0
+        self._lock = threading.Lock()
+
+    def get(self, key: Hashable, compute: Callable[[], object]):
+        """Looks up a value, computing and storing it on a miss.
+
+        Arguments:
+            key: The key of the value.
+            compute: Computes the value.
+
+        Returns:
+            The value.
+        """
+        with self._lock:
+            try:
+                value = self.entries[key]
+            except KeyError:
+                self.misses += 1
+            else:
+                self.hits += 1
+                self.entries.move_to_end(key)
+                return value
+
+        value = compute()
+        with self._lock:
+            self.entries[key] = value
+            if self.maxsize is not None and len(self.entries) > self.maxsize:
+                self.entries.popitem(last=False)
+        return value
+
+    def clear(self):
+        with self._lock:
+            self.entries.clear()
+            self.hits = 0
+            self.misses = 0
+
+    def stats(self) -> CacheStats:
+        """Summarizes the use of the cache. The memory use is estimated
+        by walking the stored keys and values.
+
+        Returns:
+            The number of entries, the size limit, the hits and misses,
+            the hit rate, and the memory use in bytes.
+        """
+        with self._lock:
+            lookups = self.hits + self.misses
+            return {
+                "entries": len(self.entries),
+                "maxsize": self.maxsize,
+                "hits": self.hits,
+                "misses": self.misses,
+                "hit_rate": self.hits / lookups if lookups else 0.0,
+                "memory": deep_sizeof(self.entries),
+            }
+
+
+def deep_sizeof(obj: object, seen: set[int] | None = None) -> int:
+    """Estimates the memory used by an object and the containers and
+    strings it holds. Objects shared between several containers are
+    counted once.
+
+    Arguments:
+        obj: The object.
+        seen: The ids of the objects counted so far.
+
+    Returns:
+        The estimated size in bytes.
+    """
+    if seen is None:
+        seen = set()
+    if id(obj) in seen:
+        return 0
+    seen.add(id(obj))
+
+    size = sys.getsizeof(obj)
+    if isinstance(obj, dict):
+        size += sum(
+            deep_sizeof(key, seen) + deep_sizeof(value, seen)
+            for key, value in obj.items()
+        )
+    elif isinstance(obj, (tuple, list, set, frozenset)):
+        size += sum(deep_sizeof(item, seen) for item in obj)
+    return size
+
+
+# The caches in use when no others were set with use_caches. Each thread
+# and asyncio task sees the caches set in its own context, and all that
+# set none share these.
+_default_caches: dict[str, LRUCache] = {}
+_caches_lock = threading.Lock()
+_caches: ContextVar[dict[str, LRUCache]] = ContextVar("caches", default=_default_caches)
+
+
+def active_cache(name: str) -> LRUCache:
+    """Gets one of the caches currently in use, creating it with its
+    default size limit if needed.
+
+    Arguments:
+        name: The name of the cache.
+
+    Returns:
+        The cache.
+    """
+    caches = _caches.get()
+    cache = caches.get(name)
+    if cache is None:
+        with _caches_lock:
+            cache = caches.get(name)
+            if cache is None:
+                cache = caches[name] = LRUCache(CACHE_SIZES[name])
+    return cache
+
+
+def cache_counts() -> dict[str, tuple[int, int]]:
+    """Gets the hits and misses of the caches currently in use.
+
+    Returns:
+        The hits and misses of each cache, by name.
+    """
+    with _caches_lock:
+        caches = list(_caches.get().items())
+    return {name: (cache.hits, cache.misses) for name, cache in caches}
+
+
+@contextmanager
+def use_caches(caches: dict[str, LRUCache]) -> Iterator[dict[str, LRUCache]]:
+    """Makes all cached functions use another set of caches for the
+    duration of a with block. Caches missing from the set are added to
+    it when first used. Only the current thread or asyncio task uses
+    them, so concurrent renders do not swap each other's caches.
+
+    Arguments:
+        caches: The caches by name.
+    """
+    token = _caches.set(caches)
+    try:
+        yield caches
+    finally:
+        _caches.reset(token)
+
+
+def cached(name: str, maxsize: int | None = None):
+    """Decorates a function with arguments that are all hashable, like
+    functools.lru_cache, but keeps its results in the named cache that
+    is currently in use, see use_caches.
+
+    Arguments:
+        name: The name of the cache.
+        maxsize: The default size limit of the cache, or None for no
+            limit.
+    """
+    CACHE_SIZES[name] = maxsize
+
+    def decorator(func):
+        @wraps(func)
+        def wrapper(*args, **kwargs):
+            key = (*args, _KWARGS, *sorted(kwargs.items())) if kwargs else args
+            return active_cache(name).get(key, lambda: func(*args, **kwargs))
+
+        return wrapper
+
+    return decorator
@@ -0,0 +1,69 @@
+from functools import cache
+
+from reportlab.pdfbase import pdfmetrics
+from reportlab.pdfbase.ttfonts import TTFont
+
+from .profiling import profiled
+
+FONTS_DIR = "assets/fonts"
+
+FONT_FILES = {
+    "Elliptica": "Elliptica.ttf",
+    "Elliptica Bold": "EllipticaBold.ttf",
+    "Exo 2.0 Thin": "Exo2.0-Thin.ttf",
+    "Exo 2.0 Thin Italic": "Exo2.0-ThinItalic.ttf",
+    "Exo 2.0 Light Italic": "Exo2.0-LightItalic.ttf",
+    "Exo 2.0 Regular": "Exo2.0-Regular.ttf",
+    "Exo 2.0 Medium": "Exo2.0-Medium.ttf",
+    "Exo 2.0 Medium Italic": "Exo2.0-MediumItalic.ttf",
+    "Exo 2.0 SemiBold": "Exo2.0-SemiBold.ttf",
+    "Exo 2.0 SemiBold Italic": "Exo2.0-SemiBoldItalic.ttf",
+    "Exo 2.0 Bold": "Exo2.0-Bold.ttf",
+    "Exo 2.0 Bold Italic": "Exo2.0-BoldItalic.ttf",
+    "Exo 2.0 ExtraBold": "Exo2.0-ExtraBold.ttf",
+    "Exo 2.0 ExtraBold Italic": "Exo2.0-ExtraBoldItalic.ttf",
+    "Exo 2.0 Black": "Exo2.0-Black.ttf",
+    "Exo 2.0 Black Italic": "Exo2.0-BlackItalic.ttf",
+}
+
+
+def font_path(fontname: str) -> str:
+    """Finds the file of one of the fonts in the assets directory.
+
+    Arguments:
+        fontname: The name of the font, as listed in FONT_FILES.
+
+    Returns:
+        The name of the font file.
+    """
+    if fontname not in FONT_FILES:
+        raise ValueError(f"Unknown font {fontname!r}")
+
+    return f"{FONTS_DIR}/{FONT_FILES[fontname]}"
+
+
+@cache
+@profiled("fonts")
+def register_font(fontname: str) -> str:
+    """Registers one of the fonts in the assets directory with
+    reportlab. Each font file is parsed at most once per process, and
+    only when a generator first asks for it.
+
+    Arguments:
+        fontname: The name of the font, as listed in FONT_FILES.
+
+    Returns:
+        The name of the font.
+    """
+    pdfmetrics.registerFont(TTFont(fontname, font_path(fontname)))
+    return fontname
+
+
+def register_fonts(*fontnames: str):
+    """Registers several fonts at once. See register_font.
+
+    Arguments:
+        fontnames: The names of the fonts.
+    """
+    for fontname in fontnames:
+        register_font(fontname)
@@ -0,0 +1,240 @@
+from typing import Iterable, TypedDict
+
+import numpy as np
+from reportlab.lib.units import mm
+
+from .fonts import register_fonts
+from .products import ProductData
+from .text import BACKING_CARD_TEXT, PRICE_TAG_TEXT, TextStyle, glyph_widths
+
+
+class LayoutMeasurements(TypedDict):
+    title_fontsizes: np.ndarray
+    subtitle_line_spans: list[tuple[tuple[int, int], ...]]
+    subtitle_lines: np.ndarray
+    overflowing: np.ndarray
+
+
+def encode_texts(texts: list[str]) -> tuple[np.ndarray, np.ndarray]:
+    """Concatenates strings into a single array of code points.
+
+    Arguments:
+        texts: The strings.
+
+    Returns:
+        The code points and the offset of each string into them,
+        followed by the total length.
+    """
+    code_points = np.frombuffer("".join(texts).encode("utf-32-le"), dtype=np.uint32)
+    offsets = np.zeros(len(texts) + 1, dtype=np.int64)
+    np.cumsum([len(text) for text in texts], out=offsets[1:])
+    return code_points, offsets
+
+
+def glyph_width_array(fontname: str, code_points: np.ndarray) -> np.ndarray:
+    """Looks up the advance widths of an array of code points.
+
+    Arguments:
+        fontname: The name of the font.
+        code_points: The code points.
+
+    Returns:
+        The widths in thousandths of an em.
+    """
+    unique, inverse = np.unique(code_points, return_inverse=True)
+    widths = glyph_widths(fontname)
+    table = np.array([widths[chr(code_point)] for code_point in unique], dtype=float)
+    return table[inverse]
+
+
+def span_widths(
+    cumulative_widths: np.ndarray, starts: np.ndarray, ends: np.ndarray
+) -> np.ndarray:
+    return cumulative_widths[ends] - cumulative_widths[starts]
+
+
+def measure_fontsizes(
+    texts: list[str], fontname: str, line_width: float, starting_fontsize: int
+) -> np.ndarray:
+    """Finds the maximum fontsize of many strings at once. Gives the
+    same result as calling text.find_max_fontsize on every string.
+
+    Arguments:
+        texts: The strings.
+        fontname: The name of the font.
+        line_width: The max width of each line.
+        starting_fontsize: The initial fontsize.
+
+    Returns:
+        The max fontsize of each string.
+    """
+    code_points, offsets = encode_texts(texts)
+    cumulative_widths = np.concatenate(
+        ([0.0], np.cumsum(glyph_width_array(fontname, code_points)))
+    )
+    widths = (
+        0.001
+        * starting_fontsize
+        * span_widths(cumulative_widths, offsets[:-1], offsets[1:])
+    )
+    with np.errstate(divide="ignore"):
+        return np.where(
+            widths <= line_width,
+            starting_fontsize,
+            starting_fontsize // (widths / line_width),
+        )
+
+
+def measure_line_breaks(
+    texts: list[str], fontname: str, fontsize: int, line_width: float
+) -> tuple[list[tuple[tuple[int, int], ...]], np.ndarray]:
+    """Line wraps many strings at once. The width of every word is
+    computed in one vectorized pass, only the greedy line filling runs
+    per word. Gives the same lines as text.line_wrap_text.
+
+    Arguments:
+        texts: The strings.
+        fontname: The name of the font.
+        fontsize: The size of the font.
+        line_width: The max width of each line.
+
+    Returns:
+        For each string, the words on every line as (start, stop)
+        indices into the words of the string, and whether any line is
+        wider than the line width.
+    """
+    if not texts:
+        return [], np.zeros(0, dtype=bool)
+
+    code_points, offsets = encode_texts(texts)
+    cumulative_widths = np.concatenate(
+        ([0.0], np.cumsum(glyph_width_array(fontname, code_points)))
+    )
+
+    # Words are separated by regular spaces only, like in
+    # text.line_wrap_text, and the end of every string ends its last
+    # word. At equal positions the end of a string sorts first, since
+    # a space there belongs to the next string.
+    spaces = np.flatnonzero(code_points == 0x20)
+    word_ends = np.concatenate((offsets[1:], spaces))
+    is_space = np.concatenate(
+        (np.zeros(len(texts), dtype=np.int64), np.ones(len(spaces), dtype=np.int64))
+    )
+    order = np.lexsort((is_space, word_ends))
+    word_ends, is_space = word_ends[order], is_space[order]
+    word_starts = np.concatenate(([0], (word_ends + is_space)[:-1]))
+
+    word_units = span_widths(cumulative_widths, word_starts, word_ends).tolist()
+    word_lengths = (word_ends - word_starts).tolist()
+    words_per_text = (np.diff(np.searchsorted(spaces, offsets)) + 1).tolist()
+    space_units = glyph_widths(fontname)[" "]
+
+    line_spans = []
+    overflowing = np.zeros(len(texts), dtype=bool)
+    first_word = 0
+    for n_text, n_words in enumerate(words_per_text):
+        text_line_starts, text_line_stops = [0], []
+        line_units = word_units[first_word]
+        line_length = word_lengths[first_word]
+        max_units = line_units
+        for n_word in range(first_word + 1, first_word + n_words):
+            if line_length == 0:
+                # An empty line is replaced by the next word, which
+                # drops leading (and repeated) spaces.
+                text_line_starts[-1] = n_word - first_word
+                line_units = word_units[n_word]
+                line_length = word_lengths[n_word]
+            elif (
+                0.001 * fontsize * (line_units + space_units + word_units[n_word])
+                <= line_width
+            ):
+                line_units += space_units + word_units[n_word]
+                line_length += 1 + word_lengths[n_word]
+            else:
+                text_line_stops.append(n_word - first_word)
+                text_line_starts.append(n_word - first_word)
+                line_units = word_units[n_word]
+                line_length = word_lengths[n_word]
+            max_units = max(max_units, line_units)
+
+        text_line_stops.append(n_words)
+        line_spans.append(tuple(zip(text_line_starts, text_line_stops, strict=True)))
+        overflowing[n_text] = 0.001 * fontsize * max_units > line_width
+        first_word += n_words
+
+    return line_spans, overflowing
+
+
+def measure_layout(
+    products: list[ProductData], style: TextStyle, line_width: float
+) -> LayoutMeasurements:
+    """Measures the titles and subtitles of many products for one
+    layout.
+
+    Arguments:
+        products: The products.
+        style: The fonts and fontsizes of the layout.
+        line_width: The max width of each line.
+
+    Returns:
+        The fitted title fontsizes, the words on every subtitle line,
+        the number of subtitle lines, and whether a subtitle has a word
+        that is wider than a line.
+    """
+    line_spans, overflowing = measure_line_breaks(
+        [product["subtitle"] for product in products],
+        style["subtitle_font"],
+        style["subtitle_fontsize"],
+        line_width,
+    )
+    return {
+        "title_fontsizes": measure_fontsizes(
+            [product["title"] for product in products],
+            style["title_font"],
+            line_width,
+            style["title_fontsize"],
+        ),
+        "subtitle_line_spans": line_spans,
+        "subtitle_lines": np.array([len(spans) for spans in line_spans]),
+        "overflowing": overflowing,
+    }
+
+
+def measure_catalog(
+    products: Iterable[ProductData],
+    tagsize=(30 * mm, 52 * mm),
+    tag_padding=2 * mm,
+    cardsize=(53 * mm, 85 * mm),
+    card_padding=4 * mm,
+) -> dict[str, LayoutMeasurements]:
+    """Measures the text of a whole catalog for both the price tag and
+    the backing card layout in one batched pass, e.g. to check new
+    products for overflowing text before anything is rendered. The
+    results are in the order of the products.
+
+    Arguments:
+        products: The products.
+        tagsize: The width and height of a price tag.
+        tag_padding: The horizontal padding of the price tag text.
+        cardsize: The width and height of a backing card.
+        card_padding: The horizontal padding of the backing card text.
+
+    Returns:
+        The measurements for the "price_tags" and "backing_cards"
+        layouts.
+    """
+    products = list(products)
+    register_fonts(
+        PRICE_TAG_TEXT["title_font"],
+        PRICE_TAG_TEXT["subtitle_font"],
+        BACKING_CARD_TEXT["title_font"],
+        BACKING_CARD_TEXT["subtitle_font"],
+    )
+    return {
+        "price_tags": measure_layout(
+            products, PRICE_TAG_TEXT, tagsize[0] - 2 * tag_padding
+        ),
+        "backing_cards": measure_layout(
+            products, BACKING_CARD_TEXT, cardsize[0] - 2 * card_padding
+        ),
+    }
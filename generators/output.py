@@ -0,0 +1,281 @@
+import os
+from collections import deque
+from io import BytesIO
+from typing import BinaryIO, Iterable
+
+from pypdf import PageObject, PdfReader
+from pypdf.generic import (
+    ArrayObject,
+    DecodedStreamObject,
+    DictionaryObject,
+    FloatObject,
+    IndirectObject,
+    NameObject,
+    NumberObject,
+    PdfObject,
+    StreamObject,
+    create_string_object,
+)
+
+from .profiling import stage
+
+CATALOG, PAGES, INFO = 1, 2, 3
+
+
+class PdfStreamWriter:
+    """Writes a PDF by appending the pages of other PDFs one source at a
+    time. Every object is written out as soon as its page is added and
+    only the byte offsets of the objects are kept, so memory does not
+    grow with the number of pages. The output only has to support
+    write(), which makes pipes such as stdout work as well.
+
+    Templates are stamped underneath the pages and cycled through, so
+    that page k gets template k modulo the number of templates. Each
+    template is stored once as a form XObject.
+    """
+
+    def __init__(self, stream: BinaryIO, title: str | None = None):
+        self.stream = stream
+        self.title = title
+        self.position = 0
+        self.offsets: dict[int, int] = {}
+        self.next_number = INFO + 1
+        self.pages: list[IndirectObject] = []
+        self.templates: list[tuple[NameObject, IndirectObject, IndirectObject]] = []
+
+        self._write(b"%PDF-1.4\n%\xe2\xe3\xcf\xd3\n")
+
+    def _write(self, data: bytes):
+        self.stream.write(data)
+        self.position += len(data)
+
+    def _reserve(self) -> IndirectObject:
+        number = self.next_number
+        self.next_number += 1
+        return IndirectObject(number, 0, None)
+
+    def _write_object(self, reference: IndirectObject, obj: PdfObject):
+        buffer = BytesIO()
+        buffer.write(f"{reference.idnum} 0 obj\n".encode("ascii"))
+        obj.write_to_stream(buffer)
+        buffer.write(b"\nendobj\n")
+        self.offsets[reference.idnum] = self.position
+        self._write(buffer.getvalue())
+
+    def _import(self, obj: PdfObject, references: dict, queue: deque) -> PdfObject:
+        """Copies an object of a source PDF. Referenced objects get new
+        object numbers and are queued to be written by _flush.
+        """
+        if isinstance(obj, IndirectObject):
+            key = (obj.idnum, obj.generation)
+            if key not in references:
+                references[key] = self._reserve()
+                queue.append(obj)
+            return references[key]
+
+        if isinstance(obj, StreamObject):
+            # The stream data is copied as is, still encoded by the
+            # filters named in the stream dictionary.
+            copy = obj.__class__()
+            copy._data = obj._data
+            copy.update(
+                (key, self._import(value, references, queue))
+                for key, value in obj.items()
+                if key != "/Length"
+            )
+            return copy
+
+        if isinstance(obj, DictionaryObject):
+            return DictionaryObject(
+                (key, self._import(value, references, queue))
+                for key, value in obj.items()
+            )
+
+        if isinstance(obj, ArrayObject):
+            return ArrayObject(self._import(value, references, queue) for value in obj)
+
+        return obj
+
+    def _flush(self, references: dict, queue: deque):
+        while queue:
+            obj = queue.popleft()
+            self._write_object(
+                references[(obj.idnum, obj.generation)],
+                self._import(obj.get_object(), references, queue),
+            )
+
+    def add_template(self, source: str | BinaryIO):
+        """Adds the first page of a PDF as a template.
+
+        Arguments:
+            source: The PDF, as a filename or binary stream.
+        """
+        template = PdfReader(source).pages[0]
+        references, queue = {}, deque()
+
+        form = DecodedStreamObject()
+        form.set_data(template.get_contents().get_data())
+        form.update(
+            {
+                NameObject("/Type"): NameObject("/XObject"),
+                NameObject("/Subtype"): NameObject("/Form"),
+                NameObject("/BBox"): ArrayObject(
+                    FloatObject(value) for value in template.mediabox
+                ),
+                NameObject("/Resources"): self._import(
+                    template.raw_get("/Resources"), references, queue
+                ),
+            }
+        )
+        form_reference = self._reserve()
+        self._write_object(form_reference, form.flate_encode())
+        self._flush(references, queue)
+
+        name = NameObject(f"/Template{len(self.templates)}")
+        stamp = DecodedStreamObject()
+        stamp.set_data(f"q {name} Do Q\n".encode("ascii"))
+        stamp_reference = self._reserve()
+        self._write_object(stamp_reference, stamp)
+
+        self.templates.append((name, form_reference, stamp_reference))
+
+    def add_page(self, page: PageObject, references: dict, queue: deque):
+        """Writes a page and everything it references.
+
+        Arguments:
+            page: The page of a source PDF.
+            references: The new references of the objects of the source
+                PDF copied so far.
+            queue: The objects waiting to be written.
+        """
+        page_copy = DictionaryObject(
+            (key, value) for key, value in page.items() if key != "/Parent"
+        )
+
+        if self.templates:
+            # The resources are copied into the page, so that the
+            # template can be added without touching shared objects.
+            resources = DictionaryObject(page["/Resources"].items())
+            xobjects = DictionaryObject()
+            if "/XObject" in resources:
+                xobjects.update(resources["/XObject"].items())
+            resources[NameObject("/XObject")] = xobjects
+            page_copy[NameObject("/Resources")] = resources
+
+            contents = page_copy.raw_get("/Contents")
+            if isinstance(contents.get_object(), ArrayObject):
+                contents = contents.get_object()
+            else:
+                contents = [contents]
+            page_copy[NameObject("/Contents")] = ArrayObject(contents)
+
+        page_copy = self._import(page_copy, references, queue)
+
+        if self.templates:
+            name, form, stamp = self.templates[len(self.pages) % len(self.templates)]
+            page_copy["/Resources"]["/XObject"][name] = form
+            page_copy["/Contents"].insert(0, stamp)
+
+        page_copy[NameObject("/Parent")] = IndirectObject(PAGES, 0, None)
+        reference = self._reserve()
+        self._write_object(reference, page_copy)
+        self.pages.append(reference)
+        self._flush(references, queue)
+
+    def add_pages(self, source: str | BinaryIO):
+        """Appends all pages of a PDF.
+
+        Arguments:
+            source: The PDF, as a filename or binary stream.
+        """
+        references, queue = {}, deque()
+        for page in PdfReader(source).pages:
+            self.add_page(page, references, queue)
+
+    def close(self):
+        """Writes the page tree, the document information, and the cross
+        reference table. The underlying stream is not closed.
+        """
+        self._write_object(
+            IndirectObject(PAGES, 0, None),
+            DictionaryObject(
+                {
+                    NameObject("/Type"): NameObject("/Pages"),
+                    NameObject("/Kids"): ArrayObject(self.pages),
+                    NameObject("/Count"): NumberObject(len(self.pages)),
+                }
+            ),
+        )
+        self._write_object(
+            IndirectObject(CATALOG, 0, None),
+            DictionaryObject(
+                {
+                    NameObject("/Type"): NameObject("/Catalog"),
+                    NameObject("/Pages"): IndirectObject(PAGES, 0, None),
+                }
+            ),
+        )
+        info = DictionaryObject()
+        if self.title is not None:
+            info[NameObject("/Title")] = create_string_object(self.title)
+        self._write_object(IndirectObject(INFO, 0, None), info)
+
+        xref_position = self.position
+        lines = [f"xref\n0 {self.next_number}\n", "0000000000 65535 f \n"]
+        lines.extend(
+            f"{self.offsets[number]:010d} 00000 n \n"
+            for number in range(1, self.next_number)
+        )
+        lines.append(
+            f"trailer\n<< /Size {self.next_number} /Root {CATALOG} 0 R"
+            f" /Info {INFO} 0 R >>\nstartxref\n{xref_position}\n%%EOF\n"
+        )
+        self._write("".join(lines).encode("ascii"))
+        self.stream.flush()
+
+
+def write_pdf(
+    output: str | os.PathLike | BinaryIO,
+    segments: Iterable[bytes],
+    title: str | None = None,
+    template_files: Iterable[str] = (),
+):
+    """Stitches rendered PDF segments into one document. Each segment is
+    written out and dropped before the next one is read, so at most one
+    segment is held in memory. A file is written under a temporary name
+    and only replaces an existing one once it is complete, so a render
+    that fails halfway leaves the previous document intact.
+
+    Arguments:
+        output: The name of the resulting file, or a binary file-like
+            object to write to.
+        segments: The PDF data of each segment.
+        title: The title of the resulting document.
+        template_files: The PDF files holding the templates to stamp
+            underneath the pages on their first pages.
+    """
+    if isinstance(output, (str, os.PathLike)):
+        temporary_file = f"{os.fspath(output)}.{os.getpid()}.tmp"
+        try:
+            with open(temporary_file, "wb") as f:
+                write_pdf(f, segments, title=title, template_files=template_files)
+            os.replace(temporary_file, output)
+        except BaseException:
+            if os.path.exists(temporary_file):
+                os.remove(temporary_file)
+            raise
+        return
+
+    with stage("merge"):
+        writer = PdfStreamWriter(output, title=title)
+        for template_file in template_files:
+            writer.add_template(template_file)
+
+    # The segments are rendered while they are iterated, outside of the
+    # merge stage.
+    for segment in segments:
+        with stage("merge"):
+            writer.add_pages(BytesIO(segment))
+
+    with stage("merge"):
+        writer.close()
@@ -0,0 +1,118 @@
+import hashlib
+import json
+import os
+from pathlib import Path
+from typing import Iterable
+
+from .assets import asset_hash
+
+# Bump this whenever a change to the drawing code changes how existing
+# pages look, so that pages rendered by older versions are not reused.
+PAGE_CACHE_VERSION = 2
+
+# The size the page cache is pruned back to after each cached render.
+PAGE_CACHE_MAX_BYTES = 256 * 1024 * 1024
+
+
+def assets_hash(filenames: Iterable[str]) -> str:
+    """Hashes all asset files a layout depends on, e.g. its fonts and
+    logo, together with the versions of the libraries rendering them.
+
+    Arguments:
+        filenames: The names of the asset files.
+
+    Returns:
+        The hex digest of the hash.
+    """
+    digest = hashlib.sha256(f"version={PAGE_CACHE_VERSION};".encode())
+    for filename in sorted(set(filenames)):
+        digest.update(f"{filename}={asset_hash(filename)};".encode())
+    return digest.hexdigest()
+
+
+def page_key(layout: str, page_data: list, options: dict, assets: str) -> str:
+    """Hashes everything a rendered sheet depends on.
+
+    Arguments:
+        layout: The name of the layout, e.g. the render function.
+        page_data: The products on the sheet.
+        options: The layout parameters.
+        assets: The hash of the asset files, see assets_hash.
+
+    Returns:
+        The hex digest of the hash.
+    """
+    data = json.dumps(
+        {
+            "layout": layout,
+            "products": [
+                [
+                    product["sku"],
+                    product["title"],
+                    product["subtitle"],
+                    product["price"],
+                ]
+                for product in page_data
+            ],
+            "options": options,
+            "assets": assets,
+        },
+        sort_keys=True,
+    )
+    return hashlib.sha256(data.encode()).hexdigest()
+
+
+def cached_page_path(cache_dir: str, key: str) -> Path:
+    """Finds the path of a rendered sheet in the page cache.
+
+    Arguments:
+        cache_dir: The page cache directory.
+        key: The key of the sheet, see page_key.
+
+    Returns:
+        The path of the rendered sheet, which may not exist yet.
+    """
+    return Path(cache_dir) / key[:2] / f"{key}.pdf"
+
+
+def touch_cached_page(path: Path) -> None:
+    """Marks a sheet in the page cache as used, so that pruning keeps
+    it over sheets that were used less recently.
+
+    Arguments:
+        path: The path of the rendered sheet.
+    """
+    try:
+        os.utime(path)
+    except OSError:
+        pass
+
+
+def prune_page_cache(cache_dir: str, max_bytes: int = PAGE_CACHE_MAX_BYTES) -> int:
+    """Removes the least recently used sheets from the page cache until
+    the sheets left take up at most max_bytes.
+
+    Arguments:
+        cache_dir: The page cache directory.
+        max_bytes: The size to prune the cache back to.
+
+    Returns:
+        The number of sheets removed.
+    """
+    entries = []
+    for path in Path(cache_dir).glob("??/*.pdf"):
+        try:
+            stat = path.stat()
+        except OSError:
+            continue
+        entries.append((stat.st_mtime, stat.st_size, path))
+
+    total = sum(size for _, size, _ in entries)
+    removed = 0
+    for _, size, path in sorted(entries, key=lambda entry: entry[0]):
+        if total <= max_bytes:
+            break
+        path.unlink(missing_ok=True)
+        total -= size
+        removed += 1
+    return removed
@@ -1,17 +1,55 @@
+from collections import deque
+from concurrent.futures import Future, ProcessPoolExecutor
+from contextlib import nullcontext
+from functools import partial
 from io import BytesIO
-from typing import TypedDict
+from itertools import batched, repeat
+from typing import BinaryIO, Callable, Iterable, Iterator, TypedDict
 
-from pypdf import PdfReader, PdfWriter
-from qrcode import ERROR_CORRECT_H, ERROR_CORRECT_L
+from qrcode import ERROR_CORRECT_H
 from reportlab.graphics import renderPDF
+from reportlab.lib.colors import toColor
 from reportlab.lib.pagesizes import A4
 from reportlab.lib.units import mm
-from reportlab.pdfbase import pdfmetrics
-from reportlab.pdfbase.ttfonts import TTFont
 from reportlab.pdfgen import canvas
-from svglib.svglib import svg2rlg
 
-from .qr_codes import generate_qrcode
+from .assets import (
+    BACKING_CARD_GRID,
+    LOGO_FILE,
+    TEMPLATE_FILES,
+    CardGrid,
+    compile_template,
+    load_drawing,
+    write_atomically,
+)
+from .cache import cache_counts
+from .fonts import font_path, register_fonts
+from .output import write_pdf
+from .page_cache import (
+    assets_hash,
+    cached_page_path,
+    page_key,
+    prune_page_cache,
+    touch_cached_page,
+)
+from .products import ProductData
+from .profiling import Profiler, active_profiler, stage, use_profiler
+from .qr_codes import draw_qrcode
+from .text import (
+    BACKING_CARD_TEXT,
+    PRICE_TAG_TEXT,
+    find_max_fontsize,
+    line_wrap_text,
+)
+
+URL_FORMAT = "cosmicflowch.art/p/{sku}"
+URL_FORMAT_QR = "https://cosmicflowch.art/p/{sku}"
+
+BACKING_CARD_ROWS = BACKING_CARD_GRID.rows
+BACKING_CARD_COLUMNS = BACKING_CARD_GRID.columns
+PAGES_PER_SEGMENT = 25
+
+FONTS = ("Exo 2.0 Regular", "Exo 2.0 Medium", "Exo 2.0 Bold")
 
 
 class PageParameters(TypedDict):
@@ -23,233 +61,293 @@ class PageParameters(TypedDict):
     rows: int
 
 
-class ProductData(TypedDict):
-    sku: str
-    quantity: int
-    title: str
-    subtitle: str
-    price: int
+def draw_backing_card_front(
+    pdf_canvas: canvas.Canvas,
+    product: ProductData,
+    cardsize=(53 * mm, 85 * mm),
+    padding=4 * mm,
+    text_color="#e5ccff",
+):
+    """Draws the front of a backing card with its top left corner at
+    the origin.
+
+    Arguments:
+        pdf_canvas: The canvas to draw on.
+        product: The product on the card.
+        cardsize: The width and height of the card.
+        padding: The horizontal padding of the text.
+        text_color: The color of the text as a hex string.
+    """
+    width = cardsize[0]
+    pdf_canvas.setFillColor(toColor(text_color))
+
+    pdf_canvas.setFont(
+        BACKING_CARD_TEXT["title_font"],
+        find_max_fontsize(
+            product["title"],
+            BACKING_CARD_TEXT["title_font"],
+            width - 2 * padding,
+            starting_fontsize=BACKING_CARD_TEXT["title_fontsize"],
+        ),
+    )
+    pdf_canvas.drawCentredString(width / 2, -10 * mm, product["title"])
+
+    pdf_canvas.setFont(
+        BACKING_CARD_TEXT["subtitle_font"], BACKING_CARD_TEXT["subtitle_fontsize"]
+    )
+    lines = line_wrap_text(
+        product["subtitle"],
+        BACKING_CARD_TEXT["subtitle_font"],
+        BACKING_CARD_TEXT["subtitle_fontsize"],
+        width - 2 * padding,
+    )
+    for k, line in enumerate(lines):
+        pdf_canvas.drawCentredString(width / 2, -15 * mm - k * 4 * mm, line)
 
 
-def find_max_fontsize(
-    text: str, fontname: str, line_width: float, starting_fontsize: int = 12
-) -> int:
-    """Finds the maximum fontsize that can be used to fit the given
-    text in the given line width.
+def draw_backing_card_back(
+    pdf_canvas: canvas.Canvas,
+    product: ProductData,
+    cardsize=(53 * mm, 85 * mm),
+    text_color="#e5ccff",
+):
+    """Draws the back of a backing card with its top left corner at the
+    origin.
 
     Arguments:
-        text: The string to be split into lines.
-        fontname: The name of the font.
-        line_width: The max width of each line.
-        starting_fontsize: The initial fontsize.
+        pdf_canvas: The canvas to draw on.
+        product: The product on the card.
+        cardsize: The width and height of the card.
+        text_color: The color of the text and QR code as a hex string.
+    """
+    width = cardsize[0]
+    pdf_canvas.setFillColor(toColor(text_color))
+
+    pdf_canvas.setFont("Exo 2.0 Bold", 10)
+    pdf_canvas.drawCentredString(width / 2, -38 * mm, "Scan for more info")
+
+    qr_size = 30 * mm
+    draw_qrcode(
+        pdf_canvas,
+        URL_FORMAT_QR.format(sku=product["sku"].lower()),
+        width / 2 - qr_size / 2,
+        -qr_size - 40 * mm,
+        qr_size,
+        error_correction=ERROR_CORRECT_H,
+        fill_color=text_color,
+    )
+    pdf_canvas.setFont("Exo 2.0 Regular", 7)
+    pdf_canvas.drawCentredString(
+        width / 2,
+        -qr_size - 43 * mm,
+        URL_FORMAT.format(sku=product["sku"].lower()),
+    )
 
-    Returns:
-        The max fontsize.
+    pdf_canvas.setFont("Exo 2.0 Bold", 16)
+    pdf_canvas.drawCentredString(width / 2, -80 * mm, f"{product['price']} kr")
+
+
+def draw_price_tag_front(
+    pdf_canvas: canvas.Canvas,
+    product: ProductData,
+    tagsize=(30 * mm, 52 * mm),
+    padding=2 * mm,
+):
+    """Draws the product specific part of the front of a price tag with
+    its top left corner at the origin.
+
+    Arguments:
+        pdf_canvas: The canvas to draw on.
+        product: The product on the tag.
+        tagsize: The width and height of the tag.
+        padding: The horizontal padding of the text.
     """
-    text_width = pdfmetrics.stringWidth(text, fontname, starting_fontsize)
-    if text_width <= line_width:
-        return starting_fontsize
-    return starting_fontsize // (text_width / line_width)
+    pdf_canvas.doForm("tag-front")
+
+    pdf_canvas.setFont(
+        PRICE_TAG_TEXT["title_font"],
+        find_max_fontsize(
+            product["title"],
+            PRICE_TAG_TEXT["title_font"],
+            tagsize[0] - 2 * padding,
+            starting_fontsize=PRICE_TAG_TEXT["title_fontsize"],
+        ),
+    )
+    pdf_canvas.drawCentredString(tagsize[0] / 2, -38 * mm, product["title"])
 
+    pdf_canvas.setFont(
+        PRICE_TAG_TEXT["subtitle_font"], PRICE_TAG_TEXT["subtitle_fontsize"]
+    )
+    lines = line_wrap_text(
+        product["subtitle"],
+        PRICE_TAG_TEXT["subtitle_font"],
+        PRICE_TAG_TEXT["subtitle_fontsize"],
+        tagsize[0] - 2 * padding,
+    )
+    for k, line in enumerate(lines):
+        pdf_canvas.drawCentredString(tagsize[0] / 2, -43 * mm - k * 3 * mm, line)
 
-def line_wrap_text(
-    text: str, fontname: str, fontsize: int, line_width: float
-) -> list[str]:
-    """Line wraps a string to lines of a give width. This reimplements
-    reportlab's simpleSplit function, which unfortunately does not
-    respect non-breaking spaces.
 
-    Argument:
-        text: The string to be split into lines.
-        fontname: The name of the font.
-        fontsize: The size of the font.
-        line_width: The max width of each line.
+def draw_price_tag_back(
+    pdf_canvas: canvas.Canvas,
+    product: ProductData,
+    tagsize=(30 * mm, 52 * mm),
+    padding=2 * mm,
+):
+    """Draws the product specific part of the back of a price tag with
+    its top left corner at the origin.
 
-    Returns:
-        A list of strings representing individual lines.
+    Arguments:
+        pdf_canvas: The canvas to draw on.
+        product: The product on the tag.
+        tagsize: The width and height of the tag.
+        padding: The horizontal padding of the QR code.
     """
-    lines = [""]
-
-    # Only split by regular space, not by non-breaking space. (This
-    # assumes the text contains no other whitespace characters like
-    # tabs or en-spaces.)
-    for word in text.split(" "):
-        if lines[-1] == "":
-            lines[-1] = word
-        elif (
-            pdfmetrics.stringWidth(f"{lines[-1]} {word}", fontname, fontsize)
-            <= line_width
-        ):
-            lines[-1] = f"{lines[-1]} {word}"
-        else:
-            lines.append(word)
+    pdf_canvas.doForm("tag-back")
+
+    qr_size = tagsize[0] - 2 * padding
+    draw_qrcode(
+        pdf_canvas,
+        URL_FORMAT_QR.format(sku=product["sku"].lower()),
+        padding,
+        -qr_size - 14 * mm,
+        qr_size,
+    )
+    pdf_canvas.setFont("Exo 2.0 Regular", 5)
+    pdf_canvas.drawCentredString(
+        tagsize[0] / 2,
+        -qr_size - 16 * mm,
+        URL_FORMAT.format(sku=product["sku"].lower()),
+    )
 
-    return lines
+    pdf_canvas.setFont("Exo 2.0 Bold", 12)
+    pdf_canvas.drawCentredString(tagsize[0] / 2, -48 * mm, f"{product['price']} kr")
 
 
-def generate_backing_cards(
-    filename: str,
-    products: list[ProductData],
+def draw_face(
+    pdf_canvas: canvas.Canvas,
+    faces: dict[tuple, str],
+    key: tuple,
+    x: float,
+    y: float,
+    draw: Callable[[canvas.Canvas], None],
+):
+    """Draws a tag face whose top left corner is at the given position.
+    The first time a key is seen, the face is rendered into a form
+    XObject, so every further copy is a single reference to that form.
+
+    Arguments:
+        pdf_canvas: The canvas to draw on.
+        faces: The form names of the faces rendered so far, by key.
+        key: Everything the face depends on.
+        x: The x coordinate of the top left corner.
+        y: The y coordinate of the top left corner.
+        draw: Draws the face with its top left corner at the origin.
+    """
+    name = faces.get(key)
+    if name is None:
+        name = faces[key] = f"face-{len(faces)}"
+        begin_tag_form(pdf_canvas, name)
+        draw(pdf_canvas)
+        pdf_canvas.endForm()
+
+    draw_form(pdf_canvas, name, x, y)
+
+
+def render_backing_cards(
+    pdf_canvas: canvas.Canvas,
+    pages: Iterable[list[ProductData]],
     pagesize=A4,
     padding=4 * mm,
     text_color="#e5ccff",
 ):
-    for fontname, fontfile in [
-        ("Exo 2.0 Regular", "Exo2.0-Regular.ttf"),
-        ("Exo 2.0 Medium", "Exo2.0-Medium.ttf"),
-        ("Exo 2.0 Bold", "Exo2.0-Bold.ttf"),
-    ]:
-        pdfmetrics.registerFont(TTFont(fontname, f"assets/fonts/{fontfile}"))
-
-    data = [product for product in products for _ in range(product["quantity"])]
-    url_format = "cosmicflowch.art/p/{sku}"
-    url_format_qr = "https://cosmicflowch.art/p/{sku}"
-
-    x0, y0 = 23.5 * mm, pagesize[1] - 19 * mm
-    width, height = 53 * mm, 85 * mm
-    gap = 2 * mm
-
-    rows, columns = 3, 3
-    pages = len(data) // (rows * columns) + 1
-    pdf_canvas = canvas.Canvas(filename, pagesize=A4)
-    pdf_canvas.setTitle("Backing Cards")
-    text_color_rgb = tuple(int(text_color[i : i + 2], 16) / 255 for i in (1, 3, 5))
-
-    for n_page in range(pages):
-        page_data = data[n_page * rows * columns : (n_page + 1) * rows * columns]
-        if len(page_data) == 0:
-            break
-
-        pdf_canvas.setFillColorRGB(*text_color_rgb)
-        for n_row in range(rows):
+    """Renders sheets of backing cards onto a canvas, as a front page
+    followed by a back page per sheet.
+
+    Arguments:
+        pdf_canvas: The canvas to draw on.
+        pages: The products on each sheet, one entry per card.
+        pagesize: The size of a page.
+        padding: The horizontal padding of the text.
+        text_color: The color of the text as a hex string.
+    """
+    register_fonts(*FONTS)
+
+    x0, y0 = BACKING_CARD_GRID.left, pagesize[1] - BACKING_CARD_GRID.top
+    cardsize = (BACKING_CARD_GRID.width, BACKING_CARD_GRID.height)
+    width, height = cardsize
+    gap = BACKING_CARD_GRID.gap
+
+    columns = BACKING_CARD_COLUMNS
+    faces = {}
+
+    for page_data in pages:
+        for n_row in range(BACKING_CARD_ROWS):
             for n_column, product in enumerate(
                 page_data[n_row * columns : (n_row + 1) * columns]
             ):
-                x = x0 + (width + gap) * n_column
-                y = y0 - (height + gap) * n_row
-
-                pdf_canvas.setFont(
-                    "Exo 2.0 Bold",
-                    find_max_fontsize(
-                        product["title"],
-                        "Exo 2.0 Bold",
-                        width - 2 * padding,
-                        starting_fontsize=20,
+                draw_face(
+                    pdf_canvas,
+                    faces,
+                    ("front", product["title"], product["subtitle"]),
+                    x0 + (width + gap) * n_column,
+                    y0 - (height + gap) * n_row,
+                    partial(
+                        draw_backing_card_front,
+                        product=product,
+                        cardsize=cardsize,
+                        padding=padding,
+                        text_color=text_color,
                     ),
                 )
-                pdf_canvas.drawCentredString(
-                    x + width / 2,
-                    y - 10 * mm,
-                    product["title"],
-                )
-
-                pdf_canvas.setFont("Exo 2.0 Medium", 12)
-                lines = line_wrap_text(
-                    product["subtitle"], "Exo 2.0 Medium", 12, width - 2 * padding
-                )
-                for k, line in enumerate(lines):
-                    pdf_canvas.drawCentredString(
-                        x + width / 2,
-                        y - 15 * mm - k * 4 * mm,
-                        line,
-                    )
 
         pdf_canvas.showPage()
 
-        pdf_canvas.setFillColorRGB(*text_color_rgb)
-        for n_row in range(rows):
+        for n_row in range(BACKING_CARD_ROWS):
             for n_column, product in enumerate(
                 page_data[n_row * columns : (n_row + 1) * columns]
             ):
-                x = x0 + (width + gap) * (columns - n_column - 1)
-                y = y0 - (height + gap) * n_row
-
-                pdf_canvas.setFont("Exo 2.0 Bold", 10)
-                pdf_canvas.drawCentredString(
-                    x + width / 2,
-                    y - 38 * mm,
-                    "Scan for more info",
-                )
-
-                qr = BytesIO()
-                generate_qrcode(
-                    qr,
-                    url_format_qr.format(sku=product["sku"].lower()),
-                    error_correction=ERROR_CORRECT_H,
-                )
-                qr.seek(0)
-                qr_bytes = qr.read()
-                qr = BytesIO(
-                    qr_bytes.replace(
-                        b'fill="#000000"', f'fill="{text_color}"'.encode("utf-8")
-                    )
-                )
-                qr_drawing = svg2rlg(qr)
-                qr_scale = 30 * mm / qr_drawing.height
-                qr_drawing.scale(sx=qr_scale, sy=qr_scale)
-                renderPDF.draw(
-                    qr_drawing,
+                draw_face(
                     pdf_canvas,
-                    x + width / 2 - qr_drawing.width * qr_scale / 2,
-                    y - qr_drawing.height * qr_scale - 40 * mm,
-                )
-                pdf_canvas.setFont("Exo 2.0 Regular", 7)
-                pdf_canvas.drawCentredString(
-                    x + width / 2,
-                    y - qr_drawing.height * qr_scale - 43 * mm,
-                    url_format.format(sku=product["sku"].lower()),
-                )
-
-                pdf_canvas.setFont("Exo 2.0 Bold", 16)
-                pdf_canvas.drawCentredString(
-                    x + width / 2,
-                    y - 80 * mm,
-                    f"{product['price']} kr",
+                    faces,
+                    ("back", product["sku"], product["price"]),
+                    x0 + (width + gap) * (columns - n_column - 1),
+                    y0 - (height + gap) * n_row,
+                    partial(
+                        draw_backing_card_back,
+                        product=product,
+                        cardsize=cardsize,
+                        text_color=text_color,
+                    ),
                 )
 
-        if n_page < pages - 1:
-            pdf_canvas.showPage()
-
-    pdf_canvas.save()
-
-    reader = PdfReader(filename)
-    writer = PdfWriter()
-    writer.add_metadata({"/Title": "Backing Cards"})
-    template_files = [
-        "assets/templates/backing-cards-front.pdf",
-        "assets/templates/backing-cards-back.pdf",
-    ]
-
-    for k, page in enumerate(reader.pages):
-        template = PdfReader(template_files[k % len(template_files)]).pages[0]
-        template.merge_page(page)
-        writer.add_page(template)
-
-    with open(filename, "wb") as f:
-        writer.write(f)
+        pdf_canvas.showPage()
 
 
-def generate_price_tags(
-    filename: str,
-    products: list[ProductData],
+def render_price_tags(
+    pdf_canvas: canvas.Canvas,
+    pages: Iterable[list[ProductData]],
     tagsize=(30 * mm, 52 * mm),
     pagesize=A4,
     cross_size=2 * mm,
     margin=10 * mm,
     padding=2 * mm,
 ):
-    for fontname, fontfile in [
-        ("Exo 2.0 Regular", "Exo2.0-Regular.ttf"),
-        ("Exo 2.0 Medium", "Exo2.0-Medium.ttf"),
-        ("Exo 2.0 Bold", "Exo2.0-Bold.ttf"),
-    ]:
-        pdfmetrics.registerFont(TTFont(fontname, f"assets/fonts/{fontfile}"))
-
-    tag_data = [product for product in products for _ in range(product["quantity"])]
-    url_format = "cosmicflowch.art/p/{sku}"
-    url_format_qr = "https://cosmicflowch.art/p/{sku}"
-
-    logo_drawing = svg2rlg("assets/logo/cfc-logo-grey.svg")
+    """Renders sheets of price tags onto a canvas, as a front page
+    followed by a back page per sheet.
+
+    Arguments:
+        pdf_canvas: The canvas to draw on.
+        pages: The products on each sheet, one entry per tag.
+        tagsize: The width and height of a tag.
+        pagesize: The size of a page.
+        cross_size: The length of the arms of the crop marks.
+        margin: The minimum margin around the tags.
+        padding: The horizontal padding of the tag content.
+    """
+    register_fonts(*FONTS)
+
+    logo_drawing = load_drawing(LOGO_FILE)
     logo_scale = (tagsize[0] - 2 * padding) / logo_drawing.width
     logo_drawing.scale(sx=logo_scale, sy=logo_scale)
 
@@ -257,106 +355,402 @@ def generate_price_tags(
         tagsize=tagsize, pagesize=pagesize, margin=margin
     )
     rows, columns = parameters["rows"], parameters["columns"]
-    pages = len(tag_data) // (rows * columns) + 1
-    pdf_canvas = canvas.Canvas(filename, pagesize=A4)
-    pdf_canvas.setTitle("Price Tags")
-    for n_page in range(pages):
-        page_data = tag_data[n_page * rows * columns : (n_page + 1) * rows * columns]
-        if len(page_data) == 0:
-            break
-
-        add_mesh(pdf_canvas, parameters, tagsize=tagsize, cross_size=cross_size)
+    faces = {}
+
+    # Everything that is identical on every page or every tag is drawn
+    # once into a form XObject and referenced wherever it is needed.
+    pdf_canvas.beginForm("mesh-front")
+    add_mesh(pdf_canvas, parameters, tagsize=tagsize, cross_size=cross_size)
+    pdf_canvas.endForm()
+
+    pdf_canvas.beginForm("mesh-back")
+    add_mesh(pdf_canvas, parameters, tagsize=tagsize)
+    pdf_canvas.endForm()
+
+    begin_tag_form(pdf_canvas, "tag-front")
+    pdf_canvas.setLineWidth(0.4)
+    pdf_canvas.circle(tagsize[0] / 2, -6 * mm, 2 * mm)
+    renderPDF.draw(logo_drawing, pdf_canvas, padding, -30 * mm)
+    pdf_canvas.endForm()
+
+    begin_tag_form(pdf_canvas, "tag-back")
+    pdf_canvas.setLineWidth(0.4)
+    pdf_canvas.circle(tagsize[0] / 2, -6 * mm, 2 * mm)
+    pdf_canvas.setFont("Exo 2.0 Bold", 8)
+    pdf_canvas.drawCentredString(tagsize[0] / 2, -13 * mm, "Scan for more info")
+    pdf_canvas.endForm()
+
+    for page_data in pages:
+        pdf_canvas.doForm("mesh-front")
         for n_row in range(rows):
             for n_column, product in enumerate(
                 page_data[n_row * columns : (n_row + 1) * columns]
             ):
-                x = parameters["box_x"] + tagsize[0] * n_column
-                y = parameters["box_y"] + parameters["box_h"] - tagsize[1] * n_row
-
-                pdf_canvas.circle(x + tagsize[0] / 2, y - 6 * mm, 2 * mm)
-
-                renderPDF.draw(
-                    logo_drawing,
+                draw_face(
                     pdf_canvas,
-                    x + padding,
-                    y - 30 * mm,
-                )
-
-                pdf_canvas.setFont(
-                    "Exo 2.0 Bold",
-                    find_max_fontsize(
-                        product["title"],
-                        "Exo 2.0 Bold",
-                        tagsize[0] - 2 * padding,
-                        starting_fontsize=12,
+                    faces,
+                    ("front", product["title"], product["subtitle"]),
+                    parameters["box_x"] + tagsize[0] * n_column,
+                    parameters["box_y"] + parameters["box_h"] - tagsize[1] * n_row,
+                    partial(
+                        draw_price_tag_front,
+                        product=product,
+                        tagsize=tagsize,
+                        padding=padding,
                     ),
                 )
-                pdf_canvas.drawCentredString(
-                    x + tagsize[0] / 2,
-                    y - 38 * mm,
-                    product["title"],
-                )
-
-                pdf_canvas.setFont("Exo 2.0 Medium", 8)
-                lines = line_wrap_text(
-                    product["subtitle"], "Exo 2.0 Medium", 8, tagsize[0] - 2 * padding
-                )
-                for k, line in enumerate(lines):
-                    pdf_canvas.drawCentredString(
-                        x + tagsize[0] / 2,
-                        y - 43 * mm - k * 3 * mm,
-                        line,
-                    )
 
         pdf_canvas.showPage()
-        add_mesh(pdf_canvas, parameters, tagsize=tagsize)
+        pdf_canvas.doForm("mesh-back")
 
         for n_row in range(rows):
             for n_column, product in enumerate(
                 page_data[n_row * columns : (n_row + 1) * columns]
             ):
-                x = parameters["box_x"] + tagsize[0] * (columns - n_column - 1)
-                y = parameters["box_y"] + parameters["box_h"] - tagsize[1] * n_row
+                draw_face(
+                    pdf_canvas,
+                    faces,
+                    ("back", product["sku"], product["price"]),
+                    parameters["box_x"] + tagsize[0] * (columns - n_column - 1),
+                    parameters["box_y"] + parameters["box_h"] - tagsize[1] * n_row,
+                    partial(
+                        draw_price_tag_back,
+                        product=product,
+                        tagsize=tagsize,
+                        padding=padding,
+                    ),
+                )
 
-                pdf_canvas.circle(x + tagsize[0] / 2, y - 6 * mm, 2 * mm)
+        pdf_canvas.showPage()
 
-                pdf_canvas.setFont("Exo 2.0 Bold", 8)
-                pdf_canvas.drawCentredString(
-                    x + tagsize[0] / 2,
-                    y - 13 * mm,
-                    "Scan for more info",
-                )
 
-                qr = BytesIO()
-                generate_qrcode(qr, url_format_qr.format(sku=product["sku"].lower()))
-                qr.seek(0)
-                qr_drawing = svg2rlg(qr)
-                qr_scale = (tagsize[0] - 2 * padding) / qr_drawing.width
-                qr_drawing.scale(sx=qr_scale, sy=qr_scale)
-                renderPDF.draw(
-                    qr_drawing,
-                    pdf_canvas,
-                    x + padding,
-                    y - qr_drawing.height * qr_scale - 14 * mm,
-                )
-                pdf_canvas.setFont("Exo 2.0 Regular", 5)
-                pdf_canvas.drawCentredString(
-                    x + tagsize[0] / 2,
-                    y - qr_drawing.height * qr_scale - 16 * mm,
-                    url_format.format(sku=product["sku"].lower()),
+def paginate(
+    products: Iterable[ProductData], per_page: int
+) -> Iterator[list[ProductData]]:
+    """Expands products by their quantity and splits them into pages.
+    Pages are produced lazily while the products are consumed, so only
+    one page is held in memory regardless of the quantities.
+
+    Arguments:
+        products: The products, as any iterable.
+        per_page: The number of tags or cards on a page.
+
+    Yields:
+        The products on each page.
+    """
+    page = []
+    for product in products:
+        copies = product["quantity"]
+        while copies > 0:
+            n_copies = min(copies, per_page - len(page))
+            page.extend(repeat(product, n_copies))
+            copies -= n_copies
+            if len(page) == per_page:
+                yield page
+                page = []
+
+    if page:
+        yield page
+
+
+def render_segment(
+    render: Callable, pages: Iterable[list[ProductData]], title: str, options: dict
+) -> bytes:
+    """Renders pages into a standalone PDF.
+
+    Arguments:
+        render: The function drawing the pages onto a canvas.
+        pages: The products on each page.
+        title: The title of the document.
+        options: Further keyword arguments of the render function.
+
+    Returns:
+        The PDF data.
+    """
+    pdf_buffer = BytesIO()
+    pdf_canvas = canvas.Canvas(pdf_buffer, pagesize=A4)
+    pdf_canvas.setTitle(title)
+    with stage("drawing"):
+        render(pdf_canvas, pages, **options)
+    with stage("save"):
+        pdf_canvas.save()
+    return pdf_buffer.getvalue()
+
+
+def render_segments(
+    render: Callable,
+    pages: Iterable[list[ProductData]],
+    title: str,
+    workers: int | None = None,
+    **options,
+) -> Iterator[bytes]:
+    """Renders pages into PDF segments of PAGES_PER_SEGMENT pages each,
+    either in this process or, when several workers are requested, in a
+    pool of worker processes. Pages are consumed lazily, at most two
+    segments per worker are in flight, and the segments are yielded in
+    page order.
+
+    Arguments:
+        render: The function drawing the pages onto a canvas.
+        pages: The products on each page.
+        title: The title of the document.
+        workers: The number of worker processes.
+        options: Further keyword arguments of the render function.
+
+    Yields:
+        The PDF data of each segment.
+    """
+    if workers is None or workers <= 1:
+        for chunk in batched(pages, PAGES_PER_SEGMENT):
+            yield render_segment(render, chunk, title, options)
+        return
+
+    with ProcessPoolExecutor(max_workers=workers) as executor:
+        pending = deque()
+        for chunk in batched(pages, PAGES_PER_SEGMENT):
+            pending.append(
+                executor.submit(render_segment, render, chunk, title, options)
+            )
+            if len(pending) >= 2 * workers:
+                with stage("workers"):
+                    segment = pending.popleft().result()
+                yield segment
+
+        while pending:
+            with stage("workers"):
+                segment = pending.popleft().result()
+            yield segment
+
+
+def render_cached_segments(
+    render: Callable,
+    pages: Iterable[list[ProductData]],
+    title: str,
+    cache_dir: str,
+    asset_files: Iterable[str],
+    workers: int | None = None,
+    **options,
+) -> Iterator[bytes]:
+    """Renders pages sheet by sheet, reusing sheets from the page cache.
+    Each sheet is keyed by the products on it, the layout parameters and
+    the assets, so only sheets whose inputs changed are rendered again.
+    Those are rendered in a pool of worker processes when several
+    workers are requested, and stored in the cache. Once all sheets are
+    rendered, the cache is pruned back to its size limit, dropping the
+    sheets used least recently.
+
+    Arguments:
+        render: The function drawing the pages onto a canvas.
+        pages: The products on each sheet.
+        title: The title of the document.
+        cache_dir: The page cache directory.
+        asset_files: The asset files the rendered pages depend on.
+        workers: The number of worker processes.
+        options: Further keyword arguments of the render function.
+
+    Yields:
+        The PDF data of each sheet.
+    """
+    assets = assets_hash(asset_files)
+    parallel = workers is not None and workers > 1
+
+    profiler = active_profiler()
+
+    def result(path, segment: bytes | Future) -> bytes:
+        if isinstance(segment, Future):
+            with stage("workers"):
+                segment = segment.result()
+            with stage("page cache"):
+                write_atomically(path, segment)
+        return segment
+
+    with (
+        ProcessPoolExecutor(max_workers=workers)
+        if parallel
+        else nullcontext() as executor
+    ):
+        pending = deque()
+        for page_data in pages:
+            path = cached_page_path(
+                cache_dir, page_key(render.__name__, page_data, options, assets)
+            )
+            if profiler is not None:
+                profiler.count(
+                    "page cache hits" if path.exists() else "page cache misses"
                 )
 
-                pdf_canvas.setFont("Exo 2.0 Bold", 12)
-                pdf_canvas.drawCentredString(
-                    x + tagsize[0] / 2,
-                    y - 48 * mm,
-                    f"{product['price']} kr",
+            if path.exists():
+                with stage("page cache"):
+                    pending.append((path, path.read_bytes()))
+                    touch_cached_page(path)
+            elif parallel:
+                pending.append(
+                    (
+                        path,
+                        executor.submit(
+                            render_segment, render, [page_data], title, options
+                        ),
+                    )
                 )
+            else:
+                segment = render_segment(render, [page_data], title, options)
+                with stage("page cache"):
+                    write_atomically(path, segment)
+                pending.append((path, segment))
+
+            while pending and (not parallel or len(pending) >= 2 * workers):
+                yield result(*pending.popleft())
+
+        while pending:
+            yield result(*pending.popleft())
+
+    with stage("page cache"):
+        prune_page_cache(cache_dir)
+
+
+def counted_pages(
+    pages: Iterable[list[ProductData]], profiler: Profiler
+) -> Iterator[list[ProductData]]:
+    """Counts the sheets, pages, tags and unique SKUs of a render while
+    passing its sheets through.
+
+    Arguments:
+        pages: The products on each sheet.
+        profiler: The profiler to count with.
+
+    Yields:
+        The products on each sheet.
+    """
+    for page_data in pages:
+        profiler.count("sheets")
+        profiler.count("pages", 2)
+        profiler.count("tags", len(page_data))
+        for product in page_data:
+            profiler.count_unique("unique skus", product["sku"])
+        yield page_data
+
+
+def generate(
+    output: str | BinaryIO,
+    render: Callable,
+    pages: Iterable[list[ProductData]],
+    title: str,
+    asset_files: Iterable[str],
+    template_files: Iterable[str] = (),
+    template_grid: CardGrid | None = None,
+    workers: int | None = None,
+    cache_dir: str | None = None,
+    profiler: Profiler | None = None,
+    **options,
+):
+    """Renders sheets and writes them into one document.
+
+    Arguments:
+        output: The name of the resulting file, or a binary file-like
+            object to write to.
+        render: The function drawing the pages onto a canvas.
+        pages: The products on each sheet.
+        title: The title of the document.
+        asset_files: The asset files the rendered pages depend on.
+        template_files: The SVG templates to stamp underneath the pages,
+            cycled through page by page.
+        template_grid: The cards the templates are drawn for, which
+            they are checked against when compiled.
+        workers: The number of worker processes.
+        cache_dir: The page cache directory, or None to render every
+            page.
+        profiler: Records the time of each stage and counts the pages,
+            tags and cache hits.
+        options: Further keyword arguments of the render function.
+    """
+    with use_profiler(profiler):
+        caches_before = cache_counts()
+        if profiler is not None:
+            pages = counted_pages(pages, profiler)
 
-        if n_page < pages - 1:
-            pdf_canvas.showPage()
+        if cache_dir is None:
+            segments = render_segments(render, pages, title, workers=workers, **options)
+        else:
+            segments = render_cached_segments(
+                render, pages, title, cache_dir, asset_files, workers=workers, **options
+            )
 
-    pdf_canvas.save()
+        write_pdf(
+            output,
+            segments,
+            title=title,
+            template_files=[
+                compile_template(filename, template_grid) for filename in template_files
+            ],
+        )
+
+        if profiler is not None:
+            for name, (hits, misses) in cache_counts().items():
+                hits_before, misses_before = caches_before.get(name, (0, 0))
+                profiler.count(f"{name} cache hits", hits - hits_before)
+                profiler.count(f"{name} cache misses", misses - misses_before)
+
+
+def generate_backing_cards(
+    output: str | BinaryIO,
+    products: Iterable[ProductData],
+    pagesize=A4,
+    padding=4 * mm,
+    text_color="#e5ccff",
+    workers: int | None = None,
+    cache_dir: str | None = None,
+    profiler: Profiler | None = None,
+):
+    generate(
+        output,
+        render_backing_cards,
+        paginate(products, BACKING_CARD_ROWS * BACKING_CARD_COLUMNS),
+        "Backing Cards",
+        [font_path(fontname) for fontname in FONTS],
+        template_files=[
+            TEMPLATE_FILES["backing-cards-front"],
+            TEMPLATE_FILES["backing-cards-back"],
+        ],
+        template_grid=BACKING_CARD_GRID,
+        workers=workers,
+        cache_dir=cache_dir,
+        profiler=profiler,
+        pagesize=pagesize,
+        padding=padding,
+        text_color=text_color,
+    )
+
+
+def generate_price_tags(
+    output: str | BinaryIO,
+    products: Iterable[ProductData],
+    tagsize=(30 * mm, 52 * mm),
+    pagesize=A4,
+    cross_size=2 * mm,
+    margin=10 * mm,
+    padding=2 * mm,
+    workers: int | None = None,
+    cache_dir: str | None = None,
+    profiler: Profiler | None = None,
+):
+    parameters = calculate_page_parameters(
+        tagsize=tagsize, pagesize=pagesize, margin=margin
+    )
+    generate(
+        output,
+        render_price_tags,
+        paginate(products, parameters["rows"] * parameters["columns"]),
+        "Price Tags",
+        [LOGO_FILE, *(font_path(fontname) for fontname in FONTS)],
+        workers=workers,
+        cache_dir=cache_dir,
+        profiler=profiler,
+        tagsize=tagsize,
+        pagesize=pagesize,
+        cross_size=cross_size,
+        margin=margin,
+        padding=padding,
+    )
 
 
 def calculate_page_parameters(
@@ -381,20 +775,58 @@ def add_mesh(
     tagsize=(30 * mm, 50 * mm),
     cross_size=2 * mm,
 ):
-    pdf_canvas.setLineWidth(0.4)
+    lines = []
     for i in range(parameters["columns"] + 1):
         for j in range(parameters["rows"] + 1):
-            pdf_canvas.line(
-                parameters["box_x"] + i * tagsize[0],
-                parameters["box_y"] + j * tagsize[1] - cross_size,
-                parameters["box_x"] + i * tagsize[0],
-                parameters["box_y"] + j * tagsize[1] + cross_size,
+            lines.append(
+                (
+                    parameters["box_x"] + i * tagsize[0],
+                    parameters["box_y"] + j * tagsize[1] - cross_size,
+                    parameters["box_x"] + i * tagsize[0],
+                    parameters["box_y"] + j * tagsize[1] + cross_size,
+                )
             )
     for i in range(parameters["rows"] + 1):
         for j in range(parameters["columns"] + 1):
-            pdf_canvas.line(
-                parameters["box_x"] + j * tagsize[0] - cross_size,
-                parameters["box_y"] + i * tagsize[1],
-                parameters["box_x"] + j * tagsize[0] + cross_size,
-                parameters["box_y"] + i * tagsize[1],
+            lines.append(
+                (
+                    parameters["box_x"] + j * tagsize[0] - cross_size,
+                    parameters["box_y"] + i * tagsize[1],
+                    parameters["box_x"] + j * tagsize[0] + cross_size,
+                    parameters["box_y"] + i * tagsize[1],
+                )
             )
+
+    pdf_canvas.setLineWidth(0.4)
+    pdf_canvas.lines(lines)
+
+
+def begin_tag_form(pdf_canvas: canvas.Canvas, name: str):
+    """Starts a form XObject for the content of a tag or card, drawn
+    relative to its top left corner. A form is clipped to its bounding
+    box, which therefore reaches a page size past the origin in every
+    direction, so that text running past the edge of a tag is drawn in
+    full wherever the tag is on the page.
+
+    Arguments:
+        pdf_canvas: The canvas to draw on.
+        name: The name of the form.
+    """
+    width, height = pdf_canvas._pagesize
+    pdf_canvas.beginForm(name, -width, -height, width, height)
+
+
+def draw_form(pdf_canvas: canvas.Canvas, name: str, x: float, y: float):
+    """Draws a form XObject with its origin translated to the given
+    position.
+
+    Arguments:
+        pdf_canvas: The canvas to draw on.
+        name: The name of the form.
+        x: The x coordinate of the form origin.
+        y: The y coordinate of the form origin.
+    """
+    pdf_canvas.saveState()
+    pdf_canvas.translate(x, y)
+    pdf_canvas.doForm(name)
+    pdf_canvas.restoreState()
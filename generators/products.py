@@ -0,0 +1,193 @@
+import csv
+from decimal import Decimal, InvalidOperation
+from typing import IO, Callable, Iterable, Iterator, TypedDict
+
+
+class ProductData(TypedDict):
+    sku: str
+    quantity: int
+    title: str
+    subtitle: str
+    price: int
+
+
+# Header names recognized for each field, compared case-insensitively.
+COLUMN_NAMES = {
+    "sku": ("sku", "item sku", "product sku"),
+    "title": ("title", "variant", "variation", "variant name"),
+    "subtitle": ("subtitle", "product", "item name", "product name"),
+    "price": ("price", "price (kr)", "unit price"),
+    "quantity": ("quantity", "qty", "count"),
+}
+
+# The column of each field in exports without recognized header names.
+DEFAULT_COLUMNS = {"sku": 0, "subtitle": 2, "title": 3, "price": 4, "quantity": 5}
+
+
+class RowError(ValueError):
+    """A row of a product list that cannot be converted."""
+
+    def __init__(self, line_number: int, message: str):
+        super().__init__(f"line {line_number}: {message}")
+        self.line_number = line_number
+        self.message = message
+
+
+def map_columns(header: list[str]) -> dict[str, int]:
+    """Finds the column of each field from the header row of a product
+    list. Fields whose header names are not recognized are assumed to be
+    in their column of the original export format, see DEFAULT_COLUMNS.
+
+    Arguments:
+        header: The header row.
+
+    Returns:
+        The column index of each field.
+    """
+    names = [name.strip().lower() for name in header]
+    columns = {}
+    for field, aliases in COLUMN_NAMES.items():
+        for n_column, name in enumerate(names):
+            if name in aliases:
+                columns[field] = n_column
+                break
+
+    named = dict(columns)
+    for field in COLUMN_NAMES:
+        if field in columns:
+            continue
+        column = DEFAULT_COLUMNS[field]
+        clashes = [other for other, n_column in named.items() if n_column == column]
+        if clashes:
+            raise ValueError(
+                f"No column named for {field} in the header, and its default"
+                f" column {column + 1} holds {clashes[0]}"
+            )
+        columns[field] = column
+    return columns
+
+
+def parse_integer(value: str, field: str) -> int:
+    """Converts a field to an integer, accepting decimals without a
+    fractional part such as "250.00".
+
+    Arguments:
+        value: The field.
+        field: The name of the field, for error messages.
+
+    Returns:
+        The integer.
+    """
+    try:
+        number = Decimal(value.strip())
+    except InvalidOperation:
+        raise ValueError(f"{field} {value!r} is not a number") from None
+    if number != number.to_integral_value():
+        raise ValueError(f"{field} {value!r} is not a whole number")
+    return int(number)
+
+
+def parse_row(row: list[str], columns: dict[str, int]) -> ProductData | None:
+    """Converts a row of a product list.
+
+    Arguments:
+        row: The fields of the row.
+        columns: The column index of each field.
+
+    Returns:
+        The product, or None for rows without a SKU, e.g. blank lines
+        or section headings.
+    """
+    if len(row) <= columns["sku"] or not row[columns["sku"]].strip():
+        return None
+
+    width = max(columns.values()) + 1
+    if len(row) < width:
+        raise ValueError(f"expected {width} columns, got {len(row)}")
+
+    quantity = parse_integer(row[columns["quantity"]], "quantity")
+    if quantity < 0:
+        raise ValueError(f"quantity {quantity} is negative")
+
+    return {
+        "sku": row[columns["sku"]].strip(),
+        "title": row[columns["title"]].strip(),
+        "subtitle": row[columns["subtitle"]].strip(),
+        "price": parse_integer(row[columns["price"]], "price"),
+        "quantity": quantity,
+    }
+
+
+def read_products(
+    lines: Iterable[str], on_error: Callable[[RowError], None] | None = None
+) -> Iterator[ProductData]:
+    """Reads a product list in CSV format row by row, so that products
+    can be rendered while the file is still being read. Columns are
+    mapped by the names in the header row, see COLUMN_NAMES. The header
+    is read and checked right away, so that a file that is not a
+    product list fails before anything is rendered.
+
+    Arguments:
+        lines: The lines of the CSV file, e.g. a file opened with
+            newline="".
+        on_error: Called for every row that cannot be converted, which
+            is then skipped. Without it, the first such row raises a
+            RowError.
+
+    Returns:
+        An iterator over the products.
+    """
+    reader = csv.reader(lines)
+    header = next(reader, None)
+    if header is None:
+        return iter(())
+    return _read_rows(reader, map_columns(header), on_error)
+
+
+def _read_rows(
+    reader, columns: dict[str, int], on_error: Callable[[RowError], None] | None
+) -> Iterator[ProductData]:
+    line_number = reader.line_num + 1
+    for row in reader:
+        try:
+            product = parse_row(row, columns)
+        except ValueError as error:
+            row_error = RowError(line_number, str(error))
+            if on_error is None:
+                raise row_error from None
+            on_error(row_error)
+        else:
+            if product is not None:
+                yield product
+        # Quoted fields may span several lines.
+        line_number = reader.line_num + 1
+
+
+def read_products_file(
+    filename: str, on_error: Callable[[RowError], None] | None = None
+) -> Iterator[ProductData]:
+    """Reads a product list from a CSV file, see read_products. The file
+    is opened and its header checked right away, so that a missing file
+    or an unknown header raises before any output is written. The file
+    is closed once all products have been read.
+
+    Arguments:
+        filename: The name of the CSV file.
+        on_error: Called for every row that cannot be converted.
+
+    Returns:
+        An iterator over the products.
+    """
+    # utf-8-sig skips the byte order mark spreadsheet programs add.
+    f = open(filename, newline="", encoding="utf-8-sig")
+    try:
+        products = read_products(f, on_error=on_error)
+    except BaseException:
+        f.close()
+        raise
+    return _closing(f, products)
+
+
+def _closing(f: IO, products: Iterator[ProductData]) -> Iterator[ProductData]:
+    with f:
+        yield from products
@@ -0,0 +1,176 @@
+import time
+from contextlib import contextmanager, nullcontext
+from contextvars import ContextVar
+from functools import wraps
+from typing import Callable, Hashable, Iterator, TypedDict
+
+
+class StageReport(TypedDict):
+    seconds: float
+    calls: int
+
+
+class ProfileReport(TypedDict):
+    total: float
+    stages: dict[str, StageReport]
+    counters: dict[str, int]
+
+
+class Profiler:
+    """Records how much time a render spends in each stage, e.g. font
+    loading, QR encoding or text layout, along with counters such as the
+    number of tags and pages. Stages may be nested, and the time of a
+    nested stage is not counted towards the stage around it, so the
+    stage times add up to the total time.
+
+    Stages only record work done in this process. When rendering in
+    worker processes, the time spent waiting for them is recorded as
+    the "workers" stage.
+    """
+
+    def __init__(self, callback: Callable[[str, float], None] | None = None):
+        """Creates a profiler.
+
+        Arguments:
+            callback: Called with the name and duration of every stage
+                when it ends.
+        """
+        self.callback = callback
+        self.seconds: dict[str, float] = {}
+        self.calls: dict[str, int] = {}
+        self.counters: dict[str, int] = {}
+        self.unique: dict[str, set] = {}
+        self.stack: list[str] = []
+        self.start = self.last = time.perf_counter()
+
+    def _pause(self, now: float):
+        if self.stack:
+            name = self.stack[-1]
+            self.seconds[name] = self.seconds.get(name, 0.0) + now - self.last
+        self.last = now
+
+    @contextmanager
+    def stage(self, name: str) -> Iterator[None]:
+        """Records the time of a with block as a stage.
+
+        Arguments:
+            name: The name of the stage.
+        """
+        start = time.perf_counter()
+        self._pause(start)
+        self.stack.append(name)
+        self.calls[name] = self.calls.get(name, 0) + 1
+        try:
+            yield
+        finally:
+            end = time.perf_counter()
+            self._pause(end)
+            self.stack.pop()
+            if self.callback is not None:
+                self.callback(name, end - start)
+
+    def count(self, name: str, n: int = 1):
+        self.counters[name] = self.counters.get(name, 0) + n
+
+    def count_unique(self, name: str, value: Hashable):
+        self.unique.setdefault(name, set()).add(value)
+
+    def report(self) -> ProfileReport:
+        """Summarizes the recorded stages and counters.
+
+        Returns:
+            The total time since the profiler was created, the time and
+            number of calls of each stage, and the counters.
+        """
+        return {
+            "total": time.perf_counter() - self.start,
+            "stages": {
+                name: {"seconds": seconds, "calls": self.calls[name]}
+                for name, seconds in sorted(
+                    self.seconds.items(), key=lambda item: -item[1]
+                )
+            },
+            "counters": {
+                **self.counters,
+                **{name: len(values) for name, values in self.unique.items()},
+            },
+        }
+
+
+def format_report(report: ProfileReport) -> str:
+    """Formats a profile report as a table.
+
+    Arguments:
+        report: The report.
+
+    Returns:
+        The table.
+    """
+    total = report["total"]
+    lines = [f"{'stage':16} {'seconds':>9} {'share':>7} {'calls':>8}"]
+    for name, stage in report["stages"].items():
+        lines.append(
+            f"{name:16} {stage['seconds']:9.3f}"
+            f" {stage['seconds'] / total if total else 0:7.1%} {stage['calls']:8}"
+        )
+    lines.append(f"{'total':16} {total:9.3f}")
+    lines.append("")
+    lines.extend(f"{name:28} {value:>8}" for name, value in report["counters"].items())
+    return "\n".join(lines)
+
+
+_profiler: ContextVar[Profiler | None] = ContextVar("profiler", default=None)
+_no_stage = nullcontext()
+
+
+@contextmanager
+def use_profiler(profiler: Profiler | None) -> Iterator[Profiler | None]:
+    """Makes the instrumented functions report to a profiler for the
+    duration of a with block. Only the current thread or asyncio task
+    reports to it, so concurrent renders keep their profiles apart.
+
+    Arguments:
+        profiler: The profiler, or None to disable profiling.
+    """
+    token = _profiler.set(profiler)
+    try:
+        yield profiler
+    finally:
+        _profiler.reset(token)
+
+
+def active_profiler() -> Profiler | None:
+    return _profiler.get()
+
+
+def stage(name: str):
+    """Records the time of a with block as a stage of the profiler in
+    use, if there is one.
+
+    Arguments:
+        name: The name of the stage.
+    """
+    profiler = _profiler.get()
+    if profiler is None:
+        return _no_stage
+    return profiler.stage(name)
+
+
+def profiled(name: str):
+    """Decorates a function to record each of its calls as a stage of
+    the profiler in use. Below a cache decorator, only cache misses are
+    recorded.
+
+    Arguments:
+        name: The name of the stage.
+    """
+
+    def decorator(func):
+        @wraps(func)
+        def wrapper(*args, **kwargs):
+            with stage(name):
+                return func(*args, **kwargs)
+
+        return wrapper
+
+    return decorator
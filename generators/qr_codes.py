@@ -1,9 +1,145 @@
 import qrcode
 from qrcode.image.svg import SvgPathImage
+from reportlab.graphics.shapes import Drawing, Path
+from reportlab.lib.colors import toColor
+from reportlab.pdfgen import canvas
 
+from .cache import cached
+from .profiling import profiled
 
-def generate_qrcode(f, url: str, error_correction=qrcode.constants.ERROR_CORRECT_L):
+QRCODE_CACHE_SIZE = 1024
+
+
+def build_qrcode(
+    url: str, error_correction=qrcode.constants.ERROR_CORRECT_L
+) -> qrcode.QRCode:
     qr = qrcode.QRCode(error_correction=error_correction, border=0)
     qr.add_data(url)
+    qr.make(fit=True)
+    return qr
+
+
+def generate_qrcode(f, url: str, error_correction=qrcode.constants.ERROR_CORRECT_L):
+    qr = build_qrcode(url, error_correction=error_correction)
     img = qr.make_image(image_factory=SvgPathImage)
     img.save(f)
+
+
+@cached("qr_codes", maxsize=QRCODE_CACHE_SIZE)
+@profiled("qr codes")
+def qrcode_rectangles(
+    url: str, error_correction=qrcode.constants.ERROR_CORRECT_L
+) -> tuple[int, tuple[tuple[int, int, int, int], ...]]:
+    """Encodes a URL and merges the dark modules of the QR code into
+    as few rectangles as possible. Horizontal runs of dark modules are
+    merged first, and identical runs on consecutive rows are then
+    merged into a single rectangle. The results for the most recently
+    used URLs are cached, so that memory stays bounded on large
+    catalogs.
+
+    Arguments:
+        url: The URL to be encoded.
+        error_correction: The QR code error correction level.
+
+    Returns:
+        The number of modules per side and a tuple of rectangles as
+        (column, row, width, height) in modules, counted from the top
+        left corner.
+    """
+    matrix = build_qrcode(url, error_correction=error_correction).get_matrix()
+
+    rectangles = []
+    open_runs: dict[tuple[int, int], int] = {}
+    for n_row, modules in enumerate(matrix + [[]]):
+        runs = set()
+        start = None
+        for n_column, dark in enumerate(modules + [False]):
+            if dark and start is None:
+                start = n_column
+            elif not dark and start is not None:
+                runs.add((start, n_column))
+                start = None
+
+        for run, first_row in list(open_runs.items()):
+            if run not in runs:
+                rectangles.append(
+                    (run[0], first_row, run[1] - run[0], n_row - first_row)
+                )
+                del open_runs[run]
+        for run in runs:
+            open_runs.setdefault(run, n_row)
+
+    return len(matrix), tuple(sorted(rectangles, key=lambda r: (r[1], r[0])))
+
+
+def draw_qrcode(
+    pdf_canvas: canvas.Canvas,
+    url: str,
+    x: float,
+    y: float,
+    size: float,
+    error_correction=qrcode.constants.ERROR_CORRECT_L,
+    fill_color="#000000",
+):
+    """Draws a QR code straight onto a canvas as a single filled path.
+
+    Arguments:
+        pdf_canvas: The canvas to draw on.
+        url: The URL to be encoded.
+        x: The x coordinate of the lower left corner.
+        y: The y coordinate of the lower left corner.
+        size: The width and height of the QR code.
+        error_correction: The QR code error correction level.
+        fill_color: The color of the dark modules.
+    """
+    modules, rectangles = qrcode_rectangles(url, error_correction=error_correction)
+    module_size = size / modules
+
+    path = pdf_canvas.beginPath()
+    for n_column, n_row, width, height in rectangles:
+        path.rect(
+            x + n_column * module_size,
+            y + size - (n_row + height) * module_size,
+            width * module_size,
+            height * module_size,
+        )
+
+    pdf_canvas.saveState()
+    pdf_canvas.setFillColor(toColor(fill_color))
+    pdf_canvas.drawPath(path, stroke=0, fill=1)
+    pdf_canvas.restoreState()
+
+
+def qrcode_drawing(
+    url: str,
+    size: float,
+    error_correction=qrcode.constants.ERROR_CORRECT_L,
+    fill_color="#000000",
+) -> Drawing:
+    """Builds a QR code as a reportlab drawing holding a single path.
+
+    Arguments:
+        url: The URL to be encoded.
+        size: The width and height of the drawing.
+        error_correction: The QR code error correction level.
+        fill_color: The color of the dark modules.
+
+    Returns:
+        The drawing.
+    """
+    modules, rectangles = qrcode_rectangles(url, error_correction=error_correction)
+    module_size = size / modules
+
+    path = Path(fillColor=toColor(fill_color), strokeColor=None)
+    for n_column, n_row, width, height in rectangles:
+        x0, y0 = n_column * module_size, size - (n_row + height) * module_size
+        x1, y1 = x0 + width * module_size, y0 + height * module_size
+        path.moveTo(x0, y0)
+        path.lineTo(x1, y0)
+        path.lineTo(x1, y1)
+        path.lineTo(x0, y1)
+        path.closePath()
+
+    drawing = Drawing(size, size)
+    drawing.add(path)
+    return drawing
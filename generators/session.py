@@ -0,0 +1,69 @@
+from typing import BinaryIO, Iterable
+
+from .cache import CACHE_SIZES, CacheStats, LRUCache, use_caches
+from .fonts import register_fonts
+from .measure import measure_catalog
+from .pdf import FONTS, generate_backing_cards, generate_price_tags
+from .products import ProductData
+
+
+class RenderSession:
+    """Keeps the text layout, QR code and logo caches warm across
+    several renders, e.g. the price tags and backing cards of the same
+    catalog or repeated runs in a notebook. Every session has its own
+    caches, and the module-level generators use a default set of caches
+    shared by the whole process.
+
+    Worker processes started for a render fill their own caches, which
+    are neither shared with the session nor included in its stats.
+    """
+
+    def __init__(self, cache_sizes: dict[str, int | None] | None = None):
+        """Creates a session with empty caches.
+
+        Arguments:
+            cache_sizes: Overrides the size limits of the caches by
+                name, see CACHE_SIZES. None means no limit.
+        """
+        sizes = {**CACHE_SIZES, **(cache_sizes or {})}
+        self.caches = {name: LRUCache(maxsize) for name, maxsize in sizes.items()}
+        register_fonts(*FONTS)
+
+    def price_tags(
+        self, output: str | BinaryIO, products: Iterable[ProductData], **options
+    ):
+        """Generates price tags using the caches of the session. Takes
+        the same arguments as generate_price_tags.
+        """
+        with use_caches(self.caches):
+            generate_price_tags(output, products, **options)
+
+    def backing_cards(
+        self, output: str | BinaryIO, products: Iterable[ProductData], **options
+    ):
+        """Generates backing cards using the caches of the session. Takes
+        the same arguments as generate_backing_cards.
+        """
+        with use_caches(self.caches):
+            generate_backing_cards(output, products, **options)
+
+    def measure(self, products: Iterable[ProductData], **options):
+        """Measures the text of a catalog using the caches of the
+        session. Takes the same arguments as measure_catalog.
+        """
+        with use_caches(self.caches):
+            return measure_catalog(products, **options)
+
+    def stats(self) -> dict[str, CacheStats]:
+        """Summarizes the use of the caches.
+
+        Returns:
+            The entries, size limit, hits, misses, hit rate and
+            estimated memory use of each cache, by name.
+        """
+        return {name: cache.stats() for name, cache in self.caches.items()}
+
+    def clear(self):
+        """Empties all caches and resets their counters."""
+        for cache in self.caches.values():
+            cache.clear()
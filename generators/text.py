@@ -0,0 +1,169 @@
+from typing import TypedDict
+
+from reportlab.pdfbase import pdfmetrics
+from reportlab.pdfbase.ttfonts import TTFont
+
+from .cache import cached
+from .profiling import profiled
+
+LAYOUT_CACHE_SIZE = 4096
+
+
+class TextStyle(TypedDict):
+    title_font: str
+    title_fontsize: int
+    subtitle_font: str
+    subtitle_fontsize: int
+
+
+PRICE_TAG_TEXT: TextStyle = {
+    "title_font": "Exo 2.0 Bold",
+    "title_fontsize": 12,
+    "subtitle_font": "Exo 2.0 Medium",
+    "subtitle_fontsize": 8,
+}
+
+BACKING_CARD_TEXT: TextStyle = {
+    "title_font": "Exo 2.0 Bold",
+    "title_fontsize": 20,
+    "subtitle_font": "Exo 2.0 Medium",
+    "subtitle_fontsize": 12,
+}
+
+
+class GlyphWidths(dict):
+    """The advance widths of the characters of a font in thousandths of
+    an em. For TrueType fonts the table is filled from the font's
+    metrics up front, any other character is measured once on first
+    use.
+    """
+
+    def __init__(self, fontname: str):
+        super().__init__()
+        self.fontname = fontname
+
+        font = pdfmetrics.getFont(fontname)
+        if isinstance(font, TTFont):
+            self.update(
+                (chr(code_point), width)
+                for code_point, width in font.face.charWidths.items()
+            )
+
+    def __missing__(self, char: str) -> float:
+        width = self[char] = pdfmetrics.stringWidth(char, self.fontname, 1000)
+        return width
+
+
+@cached("glyph_widths")
+@profiled("text layout")
+def glyph_widths(fontname: str) -> GlyphWidths:
+    """Gets the glyph width table of a registered font.
+
+    Arguments:
+        fontname: The name of the font.
+
+    Returns:
+        The glyph width table.
+    """
+    return GlyphWidths(fontname)
+
+
+def text_units(text: str, fontname: str) -> float:
+    """Measures a string in thousandths of an em.
+
+    Arguments:
+        text: The string to be measured.
+        fontname: The name of the font.
+
+    Returns:
+        The width of the string at a fontsize of 1000.
+    """
+    return sum(map(glyph_widths(fontname).__getitem__, text))
+
+
+def text_width(text: str, fontname: str, fontsize: float) -> float:
+    """Measures a string the same way pdfmetrics.stringWidth does, but
+    using the cached glyph width table.
+
+    Arguments:
+        text: The string to be measured.
+        fontname: The name of the font.
+        fontsize: The size of the font.
+
+    Returns:
+        The width of the string.
+    """
+    return 0.001 * fontsize * text_units(text, fontname)
+
+
+@cached("fontsizes", maxsize=LAYOUT_CACHE_SIZE)
+@profiled("text layout")
+def find_max_fontsize(
+    text: str, fontname: str, line_width: float, starting_fontsize: int = 12
+) -> int:
+    """Finds the maximum fontsize that can be used to fit the given
+    text in the given line width.
+
+    Arguments:
+        text: The string to be split into lines.
+        fontname: The name of the font.
+        line_width: The max width of each line.
+        starting_fontsize: The initial fontsize.
+
+    Returns:
+        The max fontsize.
+    """
+    width = text_width(text, fontname, starting_fontsize)
+    if width <= line_width:
+        return starting_fontsize
+    return starting_fontsize // (width / line_width)
+
+
+@cached("line_wraps", maxsize=LAYOUT_CACHE_SIZE)
+@profiled("text layout")
+def _line_wrap_text(
+    text: str, fontname: str, fontsize: int, line_width: float
+) -> tuple[str, ...]:
+    widths = glyph_widths(fontname)
+    space_units = widths[" "]
+    lines = [""]
+    line_units = 0
+
+    # Only split by regular space, not by non-breaking space. (This
+    # assumes the text contains no other whitespace characters like
+    # tabs or en-spaces.)
+    for word in text.split(" "):
+        word_units = sum(map(widths.__getitem__, word))
+        if lines[-1] == "":
+            lines[-1] = word
+            line_units = word_units
+        elif 0.001 * fontsize * (line_units + space_units + word_units) <= line_width:
+            lines[-1] = f"{lines[-1]} {word}"
+            line_units += space_units + word_units
+        else:
+            lines.append(word)
+            line_units = word_units
+
+    return tuple(lines)
+
+
+def line_wrap_text(
+    text: str, fontname: str, fontsize: int, line_width: float
+) -> list[str]:
+    """Line wraps a string to lines of a give width. This reimplements
+    reportlab's simpleSplit function, which unfortunately does not
+    respect non-breaking spaces.
+
+    The width of every word is measured once and added to the width of
+    the current line, and results are cached per set of arguments.
+
+    Argument:
+        text: The string to be split into lines.
+        fontname: The name of the font.
+        fontsize: The size of the font.
+        line_width: The max width of each line.
+
+    Returns:
+        A list of strings representing individual lines.
+    """
+    return list(_line_wrap_text(text, fontname, fontsize, line_width))
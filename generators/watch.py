@@ -0,0 +1,66 @@
+import time
+from pathlib import Path
+from typing import Iterable, Iterator
+
+
+def file_snapshot(paths: Iterable[str]) -> dict[str, int]:
+    """Records the modification times of files, and of all files below
+    directories. Missing paths are left out, so that creating them
+    counts as a change.
+
+    Arguments:
+        paths: The files and directories.
+
+    Returns:
+        The modification time in nanoseconds of every file.
+    """
+    snapshot = {}
+    for path in map(Path, paths):
+        files = path.rglob("*") if path.is_dir() else [path]
+        for file in files:
+            try:
+                stat = file.stat()
+            except FileNotFoundError:
+                continue
+            if not file.is_dir():
+                snapshot[str(file)] = stat.st_mtime_ns
+    return snapshot
+
+
+def watch_changes(paths: Iterable[str], interval: float = 0.2) -> Iterator[set[str]]:
+    """Polls files and directories for changes. A change is only
+    reported once the files have stopped changing for one interval, so
+    that a file is not read while an editor is still saving it.
+
+    Arguments:
+        paths: The files and directories to watch.
+        interval: The time between polls in seconds.
+
+    Yields:
+        All watched files first, then the files that were added,
+        changed or removed, whenever there are any.
+    """
+    paths = list(paths)
+    snapshot = file_snapshot(paths)
+    yield set(snapshot)
+
+    while True:
+        time.sleep(interval)
+        current = file_snapshot(paths)
+        if current == snapshot:
+            continue
+
+        while True:
+            time.sleep(interval)
+            settled = file_snapshot(paths)
+            if settled == current:
+                break
+            current = settled
+
+        changed = {
+            path
+            for path in snapshot.keys() | current.keys()
+            if snapshot.get(path) != current.get(path)
+        }
+        snapshot = current
+        yield changed
@@ -1,8 +1,12 @@
+import sys
+from typing import Optional
+
 import typer
 from typing_extensions import Annotated
 
-from generators import ProductData, generate_price_tags
-
+# The generators are imported inside the commands that use them, so
+# that starting the CLI, e.g. for --help, does not load reportlab and
+# the other rendering libraries.
 app = typer.Typer()
 
 
@@ -10,24 +14,208 @@ app = typer.Typer()
 def price_tags(
     input_file: str,
     output_file: Annotated[str, typer.Option("--output", "-o")] = "price_tags.pdf",
+    cache_dir: Annotated[
+        Optional[str],
+        typer.Option(help="Reuse unchanged pages rendered into this directory."),
+    ] = None,
+    profile: Annotated[
+        bool, typer.Option(help="Print the time spent in each stage.")
+    ] = False,
+    profile_output: Annotated[
+        Optional[str],
+        typer.Option(help="Write cProfile statistics of the render to this file."),
+    ] = None,
+):
+    import cProfile
+
+    from generators import (
+        Profiler,
+        RowError,
+        format_report,
+        generate_price_tags,
+        read_products_file,
+    )
+
+    bad_rows = 0
+
+    def report_bad_row(error: RowError):
+        nonlocal bad_rows
+        bad_rows += 1
+        typer.echo(f"{input_file}:{error.line_number}: {error.message}", err=True)
+
+    # Products are read while the tags are rendered, without holding the
+    # whole file in memory. Opening the file checks its header, before
+    # the output is touched.
+    try:
+        products = read_products_file(input_file, on_error=report_bad_row)
+    except (OSError, ValueError) as error:
+        typer.echo(f"Cannot read {input_file}: {error}", err=True)
+        raise typer.Exit(1) from None
+
+    profiler = Profiler() if profile else None
+    profile_run = cProfile.Profile() if profile_output else None
+    if profile_run is not None:
+        profile_run.enable()
+
+    # "-" writes the PDF to stdout, e.g. to pipe it into a print spooler.
+    generate_price_tags(
+        sys.stdout.buffer if output_file == "-" else output_file,
+        products,
+        cache_dir=cache_dir,
+        profiler=profiler,
+    )
+
+    if bad_rows:
+        typer.echo(f"Skipped {bad_rows} bad row(s)", err=True)
+    if profile_run is not None:
+        profile_run.disable()
+        profile_run.dump_stats(profile_output)
+    if profiler is not None:
+        # The report goes to stderr, since the PDF may be on stdout.
+        typer.echo(format_report(profiler.report()), err=True)
+
+
+@app.command()
+def batch(
+    source: Annotated[
+        str, typer.Argument(help="A TOML manifest or a directory of CSV files.")
+    ],
+    kind: Annotated[
+        Optional[list[str]],
+        typer.Option(help="The documents to generate for a directory of CSV files."),
+    ] = None,
+    output_dir: Annotated[
+        Optional[str],
+        typer.Option(help="Where to write the PDFs for a directory of CSV files."),
+    ] = None,
+    workers: Annotated[
+        int, typer.Option(help="Run the jobs in this many worker processes.")
+    ] = 1,
+):
+    import os
+    import time
+
+    from generators.batch import (
+        JOB_KINDS,
+        format_result,
+        jobs_from_directory,
+        load_manifest,
+        run_batch,
+    )
+
+    if os.path.isdir(source):
+        for name in kind or ():
+            if name not in JOB_KINDS:
+                raise typer.BadParameter(f"Unknown kind {name!r}", param_hint="--kind")
+        jobs = jobs_from_directory(
+            source, kinds=kind or JOB_KINDS, output_dir=output_dir
+        )
+    else:
+        try:
+            jobs = load_manifest(source)
+        except (OSError, ValueError) as error:
+            typer.echo(f"Cannot read {source}: {error}", err=True)
+            raise typer.Exit(1) from None
+
+    start = time.perf_counter()
+    bad_rows = 0
+    failed = 0
+    for result in run_batch(jobs, workers=workers):
+        for message in result["bad_rows"]:
+            typer.echo(message, err=True)
+        bad_rows += len(result["bad_rows"])
+        if result["error"] is not None:
+            failed += 1
+            typer.echo(format_result(result), err=True)
+        else:
+            print(format_result(result), flush=True)
+
+    print(f"{len(jobs)} job(s) in {time.perf_counter() - start:.3f} s")
+    if bad_rows:
+        typer.echo(f"Skipped {bad_rows} bad row(s)", err=True)
+    if failed:
+        typer.echo(f"{failed} job(s) failed", err=True)
+        raise typer.Exit(1)
+
+
+@app.command()
+def watch(
+    input_file: str,
+    output_file: Annotated[str, typer.Option("--output", "-o")] = "price_tags.pdf",
+    kind: Annotated[
+        str, typer.Option(help="price_tags or backing_cards.")
+    ] = "price_tags",
+    layout: Annotated[
+        Optional[str],
+        typer.Option(help="A TOML file of layout parameters for the generator."),
+    ] = None,
+    cache_dir: Annotated[
+        str, typer.Option(help="Where to keep the rendered pages.")
+    ] = ".cache/pages",
+    interval: Annotated[
+        float, typer.Option(help="Seconds between checks for changes.")
+    ] = 0.2,
 ):
-    with open(input_file) as f:
-        lines = [line.split(",") for line in f]
-        products: list[ProductData] = []
-        for line in lines[1:]:
-            if len(line) < 5 or not line[0]:
+    """Re-renders a document whenever its CSV, the assets or the layout
+    parameters change."""
+    import time
+    import tomllib
+    from datetime import datetime
+
+    from generators import Profiler, RenderSession, RowError, read_products_file
+    from generators.batch import JOB_KINDS
+    from generators.watch import watch_changes
+
+    if kind not in JOB_KINDS:
+        raise typer.BadParameter(f"Unknown kind {kind!r}", param_hint="--kind")
+
+    def report_bad_row(error: RowError):
+        typer.echo(f"{input_file}:{error.line_number}: {error.message}", err=True)
+
+    # The session keeps fonts, QR codes and text layout warm between
+    # rebuilds, and the page cache limits a rebuild to changed sheets.
+    session = RenderSession()
+    watched = [input_file, "assets", *([layout] if layout else [])]
+    print(f"Watching {', '.join(watched)}, press Ctrl+C to stop")
+    try:
+        for _ in watch_changes(watched, interval=interval):
+            start = time.perf_counter()
+            profiler = Profiler()
+            try:
+                options = {}
+                if layout:
+                    with open(layout, "rb") as f:
+                        options = tomllib.load(f)
+
+                getattr(session, kind)(
+                    output_file,
+                    read_products_file(input_file, on_error=report_bad_row),
+                    cache_dir=cache_dir,
+                    profiler=profiler,
+                    **options,
+                )
+            except Exception as error:
+                typer.echo(f"Rebuild failed: {error}", err=True)
                 continue
-            products.append(
-                {
-                    "sku": line[0],
-                    "title": line[3],
-                    "subtitle": line[2],
-                    "price": int(line[4]),
-                    "quantity": int(line[5]),
-                }
+
+            counters = profiler.report()["counters"]
+            print(
+                f"{datetime.now():%H:%M:%S} rebuilt {output_file} in"
+                f" {time.perf_counter() - start:.3f} s, rendered"
+                f" {counters.get('page cache misses', 0)} of"
+                f" {counters.get('sheets', 0)} sheets",
+                flush=True,
             )
+    except KeyboardInterrupt:
+        pass
+
+
+@app.command()
+def assets():
+    from generators import compile_assets
 
-    generate_price_tags(output_file, products)
+    for filename in compile_assets():
+        print(filename)
 
 
 if __name__ == "__main__":
@@ -13,8 +13,10 @@ def _():
 
 @app.cell
 def _():
-    from generators import generate_backing_cards
-    return (generate_backing_cards,)
+    from generators import RenderSession
+
+    session = RenderSession()
+    return (session,)
 
 
 @app.cell
@@ -36,9 +38,10 @@ def _(products):
 
 
 @app.cell
-def _(datetime, generate_backing_cards, products):
+def _(datetime, products, session):
     now = datetime.now()
-    generate_backing_cards(f"backing-cards-{now:%Y-%m-%d}.pdf", products)
+    session.backing_cards(f"backing-cards-{now:%Y-%m-%d}.pdf", products)
+    session.stats()
     return
 
 
@@ -6,18 +6,38 @@ app = marimo.App(width="medium")
 
 @app.cell
 def _():
-    import requests
     import os
-    return os, requests
+    from collections import Counter
+    from functools import partial
+
+    from sync import (
+        DocumentWriter,
+        MappingStore,
+        NocoDBClient,
+        Scheduler,
+        StrapiClient,
+        format_changes,
+        read_all,
+    )
+    return (
+        Counter,
+        DocumentWriter,
+        MappingStore,
+        NocoDBClient,
+        Scheduler,
+        StrapiClient,
+        format_changes,
+        os,
+        partial,
+        read_all,
+    )
 
 
 @app.cell
 def _(os):
-    NOCODB_API_TOKEN = os.environ.get("NOCODB_API_TOKEN")
-    NOCODB_API_URL = os.environ.get("NOCODB_API_URL")
-    STRAPI_API_TOKEN = os.environ.get("STRAPI_API_TOKEN")
-    STRAPI_API_URL = os.environ.get("STRAPI_API_URL")
-    return NOCODB_API_TOKEN, NOCODB_API_URL, STRAPI_API_TOKEN, STRAPI_API_URL
+    # With SYNC_DRY_RUN=1, the sync only reports what it would write.
+    DRY_RUN = os.environ.get("SYNC_DRY_RUN") == "1"
+    return (DRY_RUN,)
 
 
 @app.cell
@@ -30,160 +50,74 @@ def _():
         "Project Materials": "mtnll2g9qzlj0e0",
     }
     STRAPI_ENDPOINTS = ["projects", "material-groups", "material-variants"]
-    return NOCODB_TABLE_IDS, STRAPI_ENDPOINTS
+    # The fields that identify a document, used to find the documents of
+    # records missing from the mapping store.
+    STRAPI_NATURAL_KEYS = {
+        "material-groups": ("brand", "name"),
+        "material-variants": ("materialGroup", "name"),
+    }
+    return NOCODB_TABLE_IDS, STRAPI_ENDPOINTS, STRAPI_NATURAL_KEYS
 
 
 @app.cell
-def _(
-    NOCODB_API_TOKEN,
-    NOCODB_API_URL,
-    NOCODB_TABLE_IDS,
-    STRAPI_API_TOKEN,
-    STRAPI_API_URL,
-    requests,
-):
-    def get_nocodb_data(table_name: str, params: dict[str, str] = None) -> dict:
-        headers = {
-            "xc-token": NOCODB_API_TOKEN,
-            "Content-Type": "application/json",
-        }
-        url = f"{NOCODB_API_URL}/api/v2/tables/{NOCODB_TABLE_IDS[table_name]}/records"
-        response = requests.get(url, headers=headers, params=params)
-        response.raise_for_status()
-        return response.json()
-
-
-    def get_strapi_data(endpoint: str, params: dict[str, str] = None) -> dict:
-        headers = {
-            "Content-Type": "application/json",
-            "Authorization": f"Bearer {STRAPI_API_TOKEN}",
-        }
-        url = f"{STRAPI_API_URL}/api/{endpoint}"
-        response = requests.get(url, headers=headers, params=params)
-        response.raise_for_status()
-        return response.json()
-
-
-    def create_strapi_document(endpoint: str, data: dict) -> dict:
-        headers = {
-            "Content-Type": "application/json",
-            "Authorization": f"Bearer {STRAPI_API_TOKEN}",
-        }
-        url = f"{STRAPI_API_URL}/api/{endpoint}"
-        response = requests.post(url, headers=headers, json=data)
-        response.raise_for_status()
-        return response.json()
-
-
-    def update_strapi_document(
-        endpoint: str, document_id: int, data: dict
-    ) -> dict:
-        headers = {
-            "Content-Type": "application/json",
-            "Authorization": f"Bearer {STRAPI_API_TOKEN}",
-        }
-        url = f"{STRAPI_API_URL}/api/{endpoint}/{document_id}"
-        response = requests.put(url, headers=headers, json=data)
-        response.raise_for_status()
-        return response.json()
-    return (
-        create_strapi_document,
-        get_nocodb_data,
-        get_strapi_data,
-        update_strapi_document,
-    )
+def _(NOCODB_TABLE_IDS, NocoDBClient, StrapiClient):
+    # The URLs and tokens come from NOCODB_API_URL, NOCODB_API_TOKEN,
+    # STRAPI_API_URL and STRAPI_API_TOKEN.
+    nocodb = NocoDBClient.from_env(NOCODB_TABLE_IDS)
+    strapi = StrapiClient.from_env()
+    return nocodb, strapi
+
+
+@app.cell
+def _(MappingStore):
+    # The Strapi documents that NocoDB records were synced to in earlier
+    # runs, so that they are not created again. Without it, e.g. in a
+    # fresh checkout, records are matched to existing documents by
+    # STRAPI_NATURAL_KEYS instead.
+    mappings = MappingStore(".cache/sync.sqlite3")
+    return (mappings,)
 
 
 @app.cell
-def _(NOCODB_TABLE_IDS, get_nocodb_data):
-    nocodb_data = {
-        table_name: get_nocodb_data(table_name, params={"limit": 1000})
-        for table_name in NOCODB_TABLE_IDS.keys()
+def _(NOCODB_TABLE_IDS, nocodb, read_all):
+    nocodb_pages = {
+        table_name: nocodb.iter_records(table_name) for table_name in NOCODB_TABLE_IDS
     }
-    for table_name, table_data in nocodb_data.items():
+    nocodb_data = read_all(nocodb_pages)
+    for table_name, table_records in nocodb_data.items():
         print(
-            f"{table_name} data fetched successfully with {len(table_data['list'])} records."
+            f"{table_name} data fetched successfully with {len(table_records)}"
+            f" of {nocodb_pages[table_name].total} records."
         )
     return (nocodb_data,)
 
 
 @app.cell
-def _(STRAPI_ENDPOINTS, get_strapi_data):
-    strapi_data = {
-        endpoint: get_strapi_data(
-            endpoint,
-            params={
-                "populate": "*",
-                "pagination[pageSize]": 100,
-                "status": "draft",
-            },
+def _(STRAPI_ENDPOINTS, read_all, strapi):
+    strapi_pages = {
+        endpoint: strapi.iter_documents(
+            endpoint, params={"populate": "*", "status": "draft"}
         )
         for endpoint in STRAPI_ENDPOINTS
     }
-    for endpoint, endpoint_data in strapi_data.items():
+    strapi_data = read_all(strapi_pages)
+    for endpoint, endpoint_records in strapi_data.items():
         print(
-            f"{endpoint} data fetched successfully with {len(endpoint_data['data'])} records."
+            f"{endpoint} data fetched successfully with {len(endpoint_records)}"
+            f" of {strapi_pages[endpoint].total} records."
         )
     return (strapi_data,)
 
 
-@app.cell
-def _(create_strapi_document, nocodb_data):
-    strapi_material_groups_document_ids = {}
-    for material in nocodb_data["Materials"]["list"]:
-        created_material_group = create_strapi_document(
-            "material-groups",
-            {
-                "data": {
-                    "brand": material["Brand"],
-                    "name": material["Title"],
-                    "type": "Yarn",
-                    "yardage": f"{material['Length (m)']} m / {material['Weight (g)']} g",
-                    "composition": material["Composition"],
-                }
-            },
-        )
-        strapi_material_groups_document_ids[material["Id"]] = (
-            created_material_group["data"]["documentId"]
-        )
-    return (strapi_material_groups_document_ids,)
-
-
-@app.cell
-def _(
-    create_strapi_document,
-    nocodb_data,
-    strapi_material_groups_document_ids,
-):
-    strapi_material_variants_document_ids = {}
-    for material_variant in nocodb_data["Material Variants"]["list"]:
-        created_material_variant = create_strapi_document(
-            "material-variants",
-            {
-                "data": {
-                    "name": material_variant["Name"],
-                    "manufacturerNumber": material_variant["Manufacturer Number"],
-                    "materialGroup": strapi_material_groups_document_ids[
-                        material_variant["Materials_id"]
-                    ],
-                }
-            },
-        )
-        strapi_material_variants_document_ids[material_variant["Id"]] = (
-            created_material_variant["data"]["documentId"]
-        )
-    return (strapi_material_variants_document_ids,)
-
-
 @app.cell
 def _(nocodb_data, strapi_data):
     nocodb_project_ids_by_sku = {
         project["SKU"]: project["Id"]
-        for project in nocodb_data["Projects"]["list"]
+        for project in nocodb_data["Projects"]
     }
     strapi_project_document_ids_sku = {
         project["sku"]: project["documentId"]
-        for project in strapi_data["projects"]["data"]
+        for project in strapi_data["projects"]
     }
     nocodb_project_ids_to_strapi = {
         nocodb_id: strapi_project_document_ids_sku[sku]
@@ -199,9 +133,11 @@ def _(nocodb_data, strapi_data):
 
 
 @app.cell
-def _(nocodb_data, strapi_material_variants_document_ids):
+def _(nocodb_data):
+    # The materials of each project, by the NocoDB ID of the material
+    # variant until the variant has been created in Strapi.
     project_materials = {}
-    for project_material in nocodb_data["Project Materials"]["list"]:
+    for project_material in nocodb_data["Project Materials"]:
         project_id = project_material["Projects_id"]
         if project_id not in project_materials:
             project_materials[project_id] = {}
@@ -214,9 +150,7 @@ def _(nocodb_data, strapi_material_variants_document_ids):
             project_materials[project_id][key] = []
         project_materials[project_id][key].append(
             {
-                "materialVariant": strapi_material_variants_document_ids[
-                    project_material["Material Variants_id"]
-                ],
+                "materialVariant": project_material["Material Variants_id"],
                 "quantity": project_material["Quantity"],
                 "amountGrams": project_material["Amount (g)"],
             }
@@ -225,37 +159,151 @@ def _(nocodb_data, strapi_material_variants_document_ids):
 
 
 @app.cell
-def _(nocodb_data, nocodb_project_ids_to_strapi, project_materials):
-    strapi_project_updates = {}
-    for project in nocodb_data["Projects"]["list"]:
-        strapi_project_id = nocodb_project_ids_to_strapi.get(project["Id"])
-        if not strapi_project_id:
-            continue
+def _(
+    Counter,
+    DRY_RUN,
+    DocumentWriter,
+    STRAPI_NATURAL_KEYS,
+    Scheduler,
+    mappings,
+    nocodb_data,
+    nocodb_project_ids_to_strapi,
+    partial,
+    project_materials,
+    strapi,
+    strapi_data,
+):
+    # Only documents whose content changed since the last sync, in NocoDB
+    # or in Strapi, are written.
+    writer = DocumentWriter(
+        strapi,
+        mappings,
+        strapi_data,
+        dry_run=DRY_RUN,
+        natural_keys=STRAPI_NATURAL_KEYS,
+    )
+
+
+    def sync_material_group(material: dict, results: dict) -> str:
+        return writer.upsert(
+            "material-groups",
+            "Materials",
+            material["Id"],
+            {
+                "brand": material["Brand"],
+                "name": material["Title"],
+                "type": "Yarn",
+                "yardage": f"{material['Length (m)']} m / {material['Weight (g)']} g",
+                "composition": material["Composition"],
+            },
+        )
+
+
+    def sync_material_variant(material_variant: dict, results: dict) -> str:
+        return writer.upsert(
+            "material-variants",
+            "Material Variants",
+            material_variant["Id"],
+            {
+                "name": material_variant["Name"],
+                "manufacturerNumber": material_variant["Manufacturer Number"],
+                "materialGroup": results[
+                    ("material-groups", material_variant["Materials_id"])
+                ],
+            },
+        )
+
 
-        strapi_project_updates[strapi_project_id] = {
-            "data": {
+    def update_project(project: dict, document_id: str, results: dict) -> str:
+        materials = project_materials.get(project["Id"], {})
+
+        def with_document_ids(entries: list[dict]) -> list[dict]:
+            return [
+                {
+                    **entry,
+                    "materialVariant": results[
+                        ("material-variants", entry["materialVariant"])
+                    ],
+                }
+                for entry in entries
+            ]
+
+        return writer.update(
+            "projects",
+            document_id,
+            {
                 "title": project["Title"],
                 "sku": project["SKU"],
-                "primaryMaterial": project_materials.get(project["Id"], {}).get(
-                    "primary", []
+                "primaryMaterial": with_document_ids(materials.get("primary", [])),
+                "secondaryMaterial": with_document_ids(
+                    materials.get("secondary", [])
                 ),
-                "secondaryMaterial": project_materials.get(project["Id"], {}).get(
-                    "secondary", []
-                ),
-            }
-        }
-    return (strapi_project_updates,)
+            },
+        )
 
 
-@app.cell
-def _(strapi_project_updates, update_strapi_document):
-    for document_id, project_update_data in strapi_project_updates.items():
-        updated_document = update_strapi_document(
-            "projects", document_id, project_update_data
+    # Every write starts as soon as the documents it refers to exist: a
+    # variant after its group, a project after the variants it uses.
+    scheduler = Scheduler()
+    for _material in nocodb_data["Materials"]:
+        scheduler.add(
+            ("material-groups", _material["Id"]),
+            partial(sync_material_group, _material),
         )
-        print(
-            f"Updated project {document_id} with primary and secondary materials."
+    for _material_variant in nocodb_data["Material Variants"]:
+        scheduler.add(
+            ("material-variants", _material_variant["Id"]),
+            partial(sync_material_variant, _material_variant),
+            [("material-groups", _material_variant["Materials_id"])],
+        )
+    for _project in nocodb_data["Projects"]:
+        _document_id = nocodb_project_ids_to_strapi.get(_project["Id"])
+        if not _document_id:
+            continue
+        scheduler.add(
+            ("projects", _document_id),
+            partial(update_project, _project, _document_id),
+            [
+                ("material-variants", entry["materialVariant"])
+                for entries in project_materials.get(_project["Id"], {}).values()
+                for entry in entries
+            ],
         )
+
+    sync_results = scheduler.run()
+    strapi_material_groups_document_ids = {
+        key[1]: document_id
+        for key, document_id in sync_results.items()
+        if key[0] == "material-groups"
+    }
+    strapi_material_variants_document_ids = {
+        key[1]: document_id
+        for key, document_id in sync_results.items()
+        if key[0] == "material-variants"
+    }
+    _written = Counter(
+        (change.endpoint, change.document_id is None) for change in writer.changes
+    )
+    print(
+        f"{'Would write' if DRY_RUN else 'Wrote'}"
+        f" {_written['material-groups', True]} new and"
+        f" {_written['material-groups', False]} changed material groups,"
+        f" {_written['material-variants', True]} new and"
+        f" {_written['material-variants', False]} changed material variants,"
+        f" and {_written['projects', False]} changed projects."
+        f" {len(sync_results) - len(writer.changes)} documents were unchanged."
+    )
+    return (
+        strapi_material_groups_document_ids,
+        strapi_material_variants_document_ids,
+        writer,
+    )
+
+
+@app.cell
+def _(format_changes, writer):
+    # The fields that were, or in a dry run would be, written.
+    print(format_changes(writer.changes))
     return
 
 
@@ -14,9 +14,11 @@ def _():
 
 @app.cell
 def _():
-    from generators import generate_price_tags
+    from generators import RenderSession
 
-    return (generate_price_tags,)
+    session = RenderSession()
+
+    return (session,)
 
 
 @app.cell
@@ -152,9 +154,10 @@ def _(products):
 
 
 @app.cell
-def _(datetime, generate_price_tags, products):
+def _(datetime, products, session):
     now = datetime.now()
-    generate_price_tags(f"price-tags-{now:%Y-%m-%d}.pdf", products)
+    session.price_tags(f"price-tags-{now:%Y-%m-%d}.pdf", products)
+    session.stats()
     return
 
 
@@ -0,0 +1,29 @@
+from .changes import Change, DocumentWriter, content_hash, format_changes
+from .client import (
+    ApiClient,
+    NocoDBClient,
+    StrapiClient,
+    map_concurrently,
+    read_all,
+    retry_after_seconds,
+)
+from .mapping import MappingStore
+from .pagination import Page, Pages
+from .scheduler import Scheduler
+
+__all__ = [
+    "ApiClient",
+    "Change",
+    "DocumentWriter",
+    "MappingStore",
+    "NocoDBClient",
+    "Page",
+    "Pages",
+    "Scheduler",
+    "StrapiClient",
+    "content_hash",
+    "format_changes",
+    "map_concurrently",
+    "read_all",
+    "retry_after_seconds",
+]
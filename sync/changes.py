@@ -0,0 +1,268 @@
+import hashlib
+import json
+import threading
+from typing import Hashable, NamedTuple
+
+from .client import StrapiClient
+from .mapping import MappingStore
+
+
+class Change(NamedTuple):
+    endpoint: str
+    # None for a document that is created.
+    document_id: str | None
+    # The old and new value of each field whose value in Strapi differs.
+    fields: dict[str, tuple[object, object]]
+
+
+def normalize(value: object) -> object:
+    """Brings document content into one form, whether it was built for
+    a write or read back from Strapi. Related documents become their
+    document IDs, and the internal IDs of components are dropped.
+
+    Arguments:
+        value: The content.
+
+    Returns:
+        The normalized content.
+    """
+    if isinstance(value, dict):
+        if "documentId" in value:
+            return value["documentId"]
+        return {key: normalize(item) for key, item in value.items() if key != "id"}
+    if isinstance(value, list):
+        return [normalize(item) for item in value]
+    return value
+
+
+def content_hash(data: dict) -> str:
+    """Hashes the content of a document.
+
+    Arguments:
+        data: The content, as sent in the data field of a write.
+
+    Returns:
+        The hex digest of the hash.
+    """
+    encoded = json.dumps(normalize(data), sort_keys=True, separators=(",", ":"))
+    return hashlib.sha256(encoded.encode()).hexdigest()
+
+
+def matches(current: object, desired: object) -> bool:
+    """Checks whether the content of a document in Strapi matches the
+    content that would be written. Fields Strapi did not return, e.g.
+    relations inside components that were not populated, are ignored.
+
+    Arguments:
+        current: The content read from Strapi.
+        desired: The content that would be written.
+
+    Returns:
+        Whether they match.
+    """
+    current = normalize(current)
+    desired = normalize(desired)
+    if isinstance(desired, dict):
+        return isinstance(current, dict) and all(
+            matches(current[key], item)
+            for key, item in desired.items()
+            if key in current
+        )
+    if isinstance(desired, list):
+        return (
+            isinstance(current, list)
+            and len(current) == len(desired)
+            and all(map(matches, current, desired))
+        )
+    return current == desired
+
+
+def diff_fields(current: dict, data: dict) -> dict[str, tuple[object, object]]:
+    """Compares the fields of a document in Strapi with the content that
+    would be written.
+
+    Arguments:
+        current: The document read from Strapi.
+        data: The content that would be written.
+
+    Returns:
+        The old and new value of every field that differs.
+    """
+    return {
+        field: (normalize(current.get(field)), normalize(value))
+        for field, value in data.items()
+        if field not in current or not matches(current[field], value)
+    }
+
+
+class DocumentWriter:
+    """Writes NocoDB records to Strapi, skipping every document whose
+    content is unchanged. A document is unchanged if it was last written
+    with the same content, going by the hash kept in the mapping store,
+    and if its content in Strapi still matches, so that edits made in
+    Strapi are overwritten as well. In a dry run, the changes are only
+    collected. It can be shared by several threads.
+
+    A record missing from the mapping store, e.g. in a fresh checkout or
+    after the store was deleted, is matched to an existing document by
+    its natural key before a new document is created, so that the store
+    is rebuilt instead of every document being created again.
+    """
+
+    def __init__(
+        self,
+        strapi: StrapiClient,
+        store: MappingStore,
+        documents: dict[str, list[dict]],
+        dry_run: bool = False,
+        natural_keys: dict[str, tuple[str, ...]] | None = None,
+    ):
+        """Creates a writer.
+
+        Arguments:
+            strapi: The Strapi client.
+            store: The store of the document IDs and content hashes.
+            documents: The documents currently in Strapi, by endpoint.
+            dry_run: Whether to only collect the changes.
+            natural_keys: The fields that identify a document, by
+                endpoint, e.g. ("brand", "name"). Relations count by
+                document ID. Documents of other endpoints are only
+                matched through the mapping store.
+        """
+        self.strapi = strapi
+        self.store = store
+        self.documents = {
+            endpoint: {document["documentId"]: document for document in listing}
+            for endpoint, listing in documents.items()
+        }
+        self.dry_run = dry_run
+        self.natural_keys = natural_keys or {}
+        self.changes: list[Change] = []
+        self._unmapped: dict[tuple[str, str], dict[tuple, list[str]]] = {}
+        self._lock = threading.Lock()
+
+    def _natural_key(self, endpoint: str, content: dict) -> tuple:
+        return tuple(
+            json.dumps(normalize(content.get(field)), sort_keys=True)
+            for field in self.natural_keys[endpoint]
+        )
+
+    def find(self, endpoint: str, table: str, data: dict) -> str | None:
+        """Finds an existing document with the natural key of the given
+        content that no other record of the table is mapped to. Each
+        document is only found once, so that two records with the same
+        key do not end up sharing it.
+
+        Arguments:
+            endpoint: The Strapi endpoint.
+            table: The NocoDB table.
+            data: The content of the document.
+
+        Returns:
+            The document ID, or None if there is no such document.
+        """
+        if endpoint not in self.natural_keys:
+            return None
+        with self._lock:
+            unmapped = self._unmapped.get((endpoint, table))
+            if unmapped is None:
+                mapped = set(self.store.document_ids(table).values())
+                unmapped = self._unmapped[endpoint, table] = {}
+                for document_id, document in self.documents[endpoint].items():
+                    if document_id not in mapped:
+                        unmapped.setdefault(
+                            self._natural_key(endpoint, document), []
+                        ).append(document_id)
+            candidates = unmapped.get(self._natural_key(endpoint, data))
+            return candidates.pop(0) if candidates else None
+
+    def upsert(self, endpoint: str, table: str, source_id: Hashable, data: dict) -> str:
+        """Creates the document of a record, or updates it if the record
+        was synced before or a document with its natural key exists.
+
+        Arguments:
+            endpoint: The Strapi endpoint.
+            table: The NocoDB table.
+            source_id: The ID of the record.
+            data: The content of the document.
+
+        Returns:
+            The document ID, which in a dry run is a placeholder for
+            documents that would be created.
+        """
+        document_id = self.store.get(table, source_id)
+        if document_id is not None and document_id in self.documents[endpoint]:
+            return self.update(endpoint, document_id, data)
+
+        document_id = self.find(endpoint, table, data)
+        if document_id is not None:
+            if not self.dry_run:
+                self.store.put(table, source_id, document_id)
+            return self.update(endpoint, document_id, data)
+
+        self.changes.append(
+            Change(
+                endpoint, None, {field: (None, value) for field, value in data.items()}
+            )
+        )
+        if self.dry_run:
+            return f"<new {table} {source_id}>"
+        created = self.strapi.create_document(endpoint, {"data": data})
+        document_id = created["data"]["documentId"]
+        self.store.put(table, source_id, document_id)
+        self.store.put_content_hash(endpoint, document_id, content_hash(data))
+        return document_id
+
+    def update(self, endpoint: str, document_id: str, data: dict) -> str:
+        """Updates a document, unless its content is unchanged.
+
+        Arguments:
+            endpoint: The Strapi endpoint.
+            document_id: The ID of the document.
+            data: The content of the document.
+
+        Returns:
+            The document ID.
+        """
+        current = self.documents[endpoint].get(document_id, {})
+        new_hash = content_hash(data)
+        fields = diff_fields(current, data)
+        if not fields and self.store.content_hash(endpoint, document_id) == new_hash:
+            return document_id
+
+        self.changes.append(Change(endpoint, document_id, fields))
+        if self.dry_run:
+            return document_id
+        self.strapi.update_document(endpoint, document_id, {"data": data})
+        self.store.put_content_hash(endpoint, document_id, new_hash)
+        return document_id
+
+
+def format_changes(changes: list[Change]) -> str:
+    """Describes the changes of a sync, one document per paragraph.
+
+    Arguments:
+        changes: The changes.
+
+    Returns:
+        The description.
+    """
+    paragraphs = []
+    for change in sorted(
+        changes, key=lambda change: (change.endpoint, change.document_id or "")
+    ):
+        if change.document_id is None:
+            lines = [f"create {change.endpoint}"]
+        else:
+            lines = [f"update {change.endpoint} {change.document_id}"]
+        for field, (old, new) in change.fields.items():
+            if change.document_id is None:
+                lines.append(f"  {field}: {new!r}")
+            else:
+                lines.append(f"  {field}: {old!r} -> {new!r}")
+        if change.document_id is not None and not change.fields:
+            lines.append(
+                "  not written with this content before, no visible difference"
+            )
+        paragraphs.append("\n".join(lines))
+    return "\n\n".join(paragraphs)
@@ -0,0 +1,324 @@
+import os
+import random
+import time
+from concurrent.futures import ThreadPoolExecutor
+from datetime import datetime, timezone
+from email.utils import parsedate_to_datetime
+from typing import Callable, Iterable, TypeVar
+
+import requests
+from requests.adapters import HTTPAdapter
+
+from .pagination import Pages, nocodb_pages, strapi_pages
+
+T = TypeVar("T")
+R = TypeVar("R")
+
+MAX_CONCURRENCY = 8
+
+# Requests with these methods may be sent again after a server error or
+# a lost connection. Others are only retried when the server rejected
+# them outright with 429 Too Many Requests.
+IDEMPOTENT_METHODS = {"GET", "HEAD", "PUT", "DELETE", "OPTIONS"}
+RETRY_STATUSES = {429, 502, 503, 504}
+
+
+def retry_after_seconds(value: str | None) -> float | None:
+    """Parses a Retry-After header, which holds either a number of
+    seconds or an HTTP date.
+
+    Arguments:
+        value: The header value.
+
+    Returns:
+        The number of seconds to wait, or None if there is no usable
+        value.
+    """
+    if not value:
+        return None
+    try:
+        return max(0.0, float(value))
+    except ValueError:
+        pass
+    try:
+        retry_at = parsedate_to_datetime(value)
+    except (TypeError, ValueError):
+        return None
+    if retry_at.tzinfo is None:
+        retry_at = retry_at.replace(tzinfo=timezone.utc)
+    return max(0.0, (retry_at - datetime.now(timezone.utc)).total_seconds())
+
+
+class ApiClient:
+    """A JSON API client that reuses pooled connections and retries
+    failed requests with exponential backoff. A 429 or 503 response
+    with a Retry-After header is retried after the time the server
+    asked for. The client can be shared by several threads.
+    """
+
+    def __init__(
+        self,
+        base_url: str,
+        headers: dict[str, str] | None = None,
+        pool_size: int = MAX_CONCURRENCY,
+        max_retries: int = 5,
+        backoff: float = 0.5,
+        max_backoff: float = 30.0,
+        max_retry_after: float = 300.0,
+        timeout: float = 30.0,
+    ):
+        """Creates a client.
+
+        Arguments:
+            base_url: The URL all request paths are relative to.
+            headers: Headers sent with every request, e.g. for
+                authentication.
+            pool_size: The number of connections kept open. More
+                requests than this from different threads wait for a
+                connection, which limits the load on the server.
+            max_retries: How often a failed request is retried.
+            backoff: The wait before the first retry in seconds, doubled
+                for every further retry.
+            max_backoff: The longest wait between retries in seconds,
+                unless the server asked for a longer one.
+            max_retry_after: The longest wait a Retry-After header may
+                ask for in seconds. Requests the server asks to repeat
+                later than this fail instead.
+            timeout: The timeout of every request in seconds.
+        """
+        self.base_url = base_url.rstrip("/")
+        self.max_retries = max_retries
+        self.backoff = backoff
+        self.max_backoff = max_backoff
+        self.max_retry_after = max_retry_after
+        self.timeout = timeout
+
+        self.session = requests.Session()
+        self.session.headers.update({"Content-Type": "application/json"})
+        self.session.headers.update(headers or {})
+        adapter = HTTPAdapter(
+            pool_connections=1, pool_maxsize=pool_size, pool_block=True
+        )
+        self.session.mount("http://", adapter)
+        self.session.mount("https://", adapter)
+
+    def _delay(self, attempt: int, response: requests.Response | None) -> float | None:
+        if response is not None:
+            retry_after = retry_after_seconds(response.headers.get("Retry-After"))
+            if retry_after is not None:
+                return retry_after if retry_after <= self.max_retry_after else None
+        # Full jitter keeps clients that failed together from retrying
+        # together.
+        return random.uniform(0, min(self.max_backoff, self.backoff * 2**attempt))
+
+    def request(
+        self,
+        method: str,
+        path: str,
+        params: dict | None = None,
+        json: dict | None = None,
+    ) -> dict:
+        """Sends a request and decodes the JSON response.
+
+        Arguments:
+            method: The HTTP method.
+            path: The path relative to the base URL.
+            params: The query parameters.
+            json: The request body.
+
+        Returns:
+            The decoded response.
+        """
+        url = f"{self.base_url}/{path.lstrip('/')}"
+        for attempt in range(self.max_retries + 1):
+            last_attempt = attempt == self.max_retries
+            try:
+                response = self.session.request(
+                    method, url, params=params, json=json, timeout=self.timeout
+                )
+            except (requests.ConnectionError, requests.Timeout):
+                if last_attempt or method not in IDEMPOTENT_METHODS:
+                    raise
+                time.sleep(self._delay(attempt, None))
+                continue
+
+            retry = response.status_code in RETRY_STATUSES and (
+                response.status_code == 429 or method in IDEMPOTENT_METHODS
+            )
+            delay = self._delay(attempt, response) if retry else None
+            if delay is not None and not last_attempt:
+                time.sleep(delay)
+                continue
+
+            response.raise_for_status()
+            return response.json()
+
+    def get(self, path: str, params: dict | None = None) -> dict:
+        return self.request("GET", path, params=params)
+
+    def post(self, path: str, json: dict) -> dict:
+        return self.request("POST", path, json=json)
+
+    def put(self, path: str, json: dict) -> dict:
+        return self.request("PUT", path, json=json)
+
+    def close(self):
+        self.session.close()
+
+
+class NocoDBClient(ApiClient):
+    def __init__(self, base_url: str, token: str, table_ids: dict[str, str], **options):
+        """Creates a NocoDB client.
+
+        Arguments:
+            base_url: The URL of the NocoDB instance.
+            token: The API token.
+            table_ids: The IDs of the tables by name.
+            options: Further arguments of ApiClient.
+        """
+        super().__init__(base_url, headers={"xc-token": token}, **options)
+        self.table_ids = table_ids
+
+    @classmethod
+    def from_env(cls, table_ids: dict[str, str], **options) -> "NocoDBClient":
+        """Creates a client from the NOCODB_API_URL and NOCODB_API_TOKEN
+        environment variables.
+        """
+        return cls(
+            os.environ["NOCODB_API_URL"],
+            os.environ["NOCODB_API_TOKEN"],
+            table_ids,
+            **options,
+        )
+
+    def get_records(self, table_name: str, params: dict | None = None) -> dict:
+        return self.get(
+            f"api/v2/tables/{self.table_ids[table_name]}/records", params=params
+        )
+
+    def iter_records(
+        self,
+        table_name: str,
+        params: dict | None = None,
+        page_size: int = 1000,
+        prefetch: int = 2,
+    ) -> Pages:
+        """Pages through all records of a table.
+
+        Arguments:
+            table_name: The name of the table.
+            params: Further query parameters, e.g. a filter.
+            page_size: The number of records per request, at most the
+                limit configured in NocoDB.
+            prefetch: The number of pages fetched ahead.
+
+        Returns:
+            The pages, which also report the total number of records.
+        """
+        return nocodb_pages(
+            lambda page_params: self.get_records(table_name, page_params),
+            params,
+            page_size,
+            prefetch,
+        )
+
+
+class StrapiClient(ApiClient):
+    def __init__(self, base_url: str, token: str, **options):
+        """Creates a Strapi client.
+
+        Arguments:
+            base_url: The URL of the Strapi instance.
+            token: The API token.
+            options: Further arguments of ApiClient.
+        """
+        super().__init__(
+            base_url, headers={"Authorization": f"Bearer {token}"}, **options
+        )
+
+    @classmethod
+    def from_env(cls, **options) -> "StrapiClient":
+        """Creates a client from the STRAPI_API_URL and STRAPI_API_TOKEN
+        environment variables.
+        """
+        return cls(
+            os.environ["STRAPI_API_URL"], os.environ["STRAPI_API_TOKEN"], **options
+        )
+
+    def get_documents(self, endpoint: str, params: dict | None = None) -> dict:
+        return self.get(f"api/{endpoint}", params=params)
+
+    def iter_documents(
+        self,
+        endpoint: str,
+        params: dict | None = None,
+        page_size: int = 100,
+        prefetch: int = 2,
+    ) -> Pages:
+        """Pages through all documents of an endpoint.
+
+        Arguments:
+            endpoint: The endpoint, e.g. "projects".
+            params: Further query parameters, e.g. populate or status.
+            page_size: The number of documents per request, at most the
+                maxLimit configured in Strapi.
+            prefetch: The number of pages fetched ahead.
+
+        Returns:
+            The pages, which also report the total number of documents.
+        """
+        return strapi_pages(
+            lambda page_params: self.get_documents(endpoint, page_params),
+            params,
+            page_size,
+            prefetch,
+        )
+
+    def create_document(self, endpoint: str, data: dict) -> dict:
+        return self.post(f"api/{endpoint}", json=data)
+
+    def update_document(self, endpoint: str, document_id: str, data: dict) -> dict:
+        return self.put(f"api/{endpoint}/{document_id}", json=data)
+
+
+def map_concurrently(
+    func: Callable[[T], R], items: Iterable[T], max_workers: int = MAX_CONCURRENCY
+) -> list[R]:
+    """Calls a function on many items in a pool of threads, e.g. to send
+    independent requests at the same time. At most max_workers calls run
+    at once.
+
+    Arguments:
+        func: The function.
+        items: The items.
+        max_workers: The number of threads.
+
+    Returns:
+        The results, in the order of the items.
+    """
+    with ThreadPoolExecutor(max_workers=max_workers) as executor:
+        return list(executor.map(func, items))
+
+
+def read_all(
+    listings: dict[str, Pages], max_workers: int = MAX_CONCURRENCY
+) -> dict[str, list[dict]]:
+    """Reads several paginated listings in parallel, e.g. all tables of
+    a database.
+
+    Arguments:
+        listings: The pages of each listing by name.
+        max_workers: The number of listings read at once.
+
+    Returns:
+        The records of each listing by name.
+    """
+    return dict(
+        zip(
+            listings,
+            map_concurrently(
+                lambda pages: list(pages.records()), listings.values(), max_workers
+            ),
+            strict=True,
+        )
+    )
@@ -0,0 +1,138 @@
+import sqlite3
+import threading
+from pathlib import Path
+from typing import Hashable
+
+SCHEMA = """
+CREATE TABLE IF NOT EXISTS mappings (
+    source_table TEXT NOT NULL,
+    source_id NOT NULL,
+    document_id TEXT NOT NULL,
+    PRIMARY KEY (source_table, source_id)
+);
+CREATE TABLE IF NOT EXISTS content_hashes (
+    endpoint TEXT NOT NULL,
+    document_id TEXT NOT NULL,
+    content_hash TEXT NOT NULL,
+    PRIMARY KEY (endpoint, document_id)
+);
+"""
+
+
+class MappingStore:
+    """Remembers which Strapi document each NocoDB record was synced to,
+    and the hash of the content each document was last written with, in
+    an SQLite database that persists between runs. With it, a record is
+    only created in Strapi once, however often the sync runs, and only
+    updated when its content changed. The store can be shared by several
+    threads.
+    """
+
+    def __init__(self, filename: str):
+        """Opens a store, creating it if it does not exist.
+
+        Arguments:
+            filename: The name of the database, or ":memory:" for a store
+                that is not kept.
+        """
+        if filename != ":memory:":
+            Path(filename).parent.mkdir(parents=True, exist_ok=True)
+        self._lock = threading.Lock()
+        self._db = sqlite3.connect(filename, check_same_thread=False)
+        self._db.execute("PRAGMA journal_mode=WAL")
+        self._db.executescript(SCHEMA)
+
+    def get(self, table: str, source_id: Hashable) -> str | None:
+        """Looks up the document of a record.
+
+        Arguments:
+            table: The NocoDB table.
+            source_id: The ID of the record.
+
+        Returns:
+            The document ID, or None if the record was never synced.
+        """
+        with self._lock:
+            row = self._db.execute(
+                "SELECT document_id FROM mappings"
+                " WHERE source_table = ? AND source_id = ?",
+                (table, source_id),
+            ).fetchone()
+        return row[0] if row is not None else None
+
+    def put(self, table: str, source_id: Hashable, document_id: str):
+        """Records the document of a record. Every mapping is committed
+        right away, so that a run that fails halfway does not create the
+        same documents again when it is repeated.
+
+        Arguments:
+            table: The NocoDB table.
+            source_id: The ID of the record.
+            document_id: The ID of the Strapi document.
+        """
+        with self._lock, self._db:
+            self._db.execute(
+                "INSERT INTO mappings (source_table, source_id, document_id)"
+                " VALUES (?, ?, ?) ON CONFLICT (source_table, source_id)"
+                " DO UPDATE SET document_id = excluded.document_id",
+                (table, source_id, document_id),
+            )
+
+    def document_ids(self, table: str) -> dict[Hashable, str]:
+        """Looks up the documents of all synced records of a table.
+
+        Arguments:
+            table: The NocoDB table.
+
+        Returns:
+            The document IDs by record ID.
+        """
+        with self._lock:
+            rows = self._db.execute(
+                "SELECT source_id, document_id FROM mappings WHERE source_table = ?",
+                (table,),
+            ).fetchall()
+        return dict(rows)
+
+    def content_hash(self, endpoint: str, document_id: str) -> str | None:
+        """Looks up the hash a document was last written with.
+
+        Arguments:
+            endpoint: The Strapi endpoint.
+            document_id: The ID of the document.
+
+        Returns:
+            The hash, or None if the document was never written.
+        """
+        with self._lock:
+            row = self._db.execute(
+                "SELECT content_hash FROM content_hashes"
+                " WHERE endpoint = ? AND document_id = ?",
+                (endpoint, document_id),
+            ).fetchone()
+        return row[0] if row is not None else None
+
+    def put_content_hash(self, endpoint: str, document_id: str, content_hash: str):
+        """Records the hash a document was written with.
+
+        Arguments:
+            endpoint: The Strapi endpoint.
+            document_id: The ID of the document.
+            content_hash: The hash, see sync.changes.content_hash.
+        """
+        with self._lock, self._db:
+            self._db.execute(
+                "INSERT INTO content_hashes (endpoint, document_id, content_hash)"
+                " VALUES (?, ?, ?) ON CONFLICT (endpoint, document_id)"
+                " DO UPDATE SET content_hash = excluded.content_hash",
+                (endpoint, document_id, content_hash),
+            )
+
+    def close(self):
+        self._db.close()
+
+    def __enter__(self) -> "MappingStore":
+        return self
+
+    def __exit__(self, *exc_info):
+        self.close()
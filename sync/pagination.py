@@ -0,0 +1,156 @@
+from collections import deque
+from concurrent.futures import Future, ThreadPoolExecutor
+from itertools import count, islice
+from math import ceil
+from typing import Callable, Iterator, NamedTuple
+
+
+class Page(NamedTuple):
+    records: list[dict]
+    # The number of records in all pages, if the API reports it.
+    total: int | None
+    last: bool
+    # The number of records in a full page, which the server may have
+    # lowered from the number requested.
+    size: int
+
+
+class Pages:
+    """The pages of a paginated listing. Iterating over it fetches the
+    first page, and then the following pages in a pool of threads while
+    the earlier ones are processed. When the API reports the number of
+    records, only the pages holding them are requested. Otherwise pages
+    are requested until one is reported as the last. The following pages
+    are requested with the page size the server used for the first one,
+    since servers lower page sizes above their limit.
+    """
+
+    def __init__(
+        self,
+        fetch_page: Callable[[int, int], Page],
+        page_size: int,
+        prefetch: int = 2,
+    ):
+        """Creates the pages of a listing without fetching any.
+
+        Arguments:
+            fetch_page: Fetches a page by its number, starting at 0, and
+                the page size.
+            page_size: The number of records per page to request.
+            prefetch: The number of pages fetched ahead.
+        """
+        self.fetch_page = fetch_page
+        self.page_size = page_size
+        self.prefetch = prefetch
+        self._first_page = None
+
+    def first_page(self) -> Page:
+        if self._first_page is None:
+            self._first_page = self.fetch_page(0, self.page_size)
+        return self._first_page
+
+    @property
+    def total(self) -> int | None:
+        """The number of records reported by the API, which fetches the
+        first page if that has not happened yet.
+        """
+        return self.first_page().total
+
+    def __iter__(self) -> Iterator[list[dict]]:
+        first_page = self.first_page()
+        yield first_page.records
+        if first_page.last:
+            return
+
+        page_size = first_page.size
+        if first_page.total is not None:
+            numbers = iter(range(1, ceil(first_page.total / page_size)))
+        else:
+            numbers = count(1)
+
+        executor = ThreadPoolExecutor(max_workers=self.prefetch)
+        pending: deque[Future[Page]] = deque(
+            executor.submit(self.fetch_page, number, page_size)
+            for number in islice(numbers, self.prefetch)
+        )
+        try:
+            while pending:
+                page = pending.popleft().result()
+                yield page.records
+                if page.last or not page.records:
+                    break
+                for number in islice(numbers, 1):
+                    pending.append(executor.submit(self.fetch_page, number, page_size))
+        finally:
+            # Pages fetched ahead of a last page that came early, or of a
+            # consumer that stopped, are dropped.
+            executor.shutdown(cancel_futures=True)
+
+    def records(self) -> Iterator[dict]:
+        """Iterates over the records of all pages."""
+        for records in self:
+            yield from records
+
+
+def nocodb_pages(
+    get: Callable[[dict], dict], params: dict | None, page_size: int, prefetch: int
+) -> Pages:
+    """Pages through NocoDB records by limit and offset.
+
+    Arguments:
+        get: Sends a request with the given query parameters.
+        params: Further query parameters, e.g. a filter.
+        page_size: The number of records per request.
+        prefetch: The number of pages fetched ahead.
+
+    Returns:
+        The pages.
+    """
+
+    def fetch_page(number: int, size: int) -> Page:
+        response = get({**(params or {}), "limit": size, "offset": number * size})
+        page_info = response.get("pageInfo", {})
+        records = response["list"]
+        last = page_info.get("isLastPage", len(records) < size)
+        # NocoDB caps the limit at its configured maximum.
+        if not last and records:
+            size = min(size, len(records))
+        return Page(records, page_info.get("totalRows"), last, size)
+
+    return Pages(fetch_page, page_size, prefetch)
+
+
+def strapi_pages(
+    get: Callable[[dict], dict], params: dict | None, page_size: int, prefetch: int
+) -> Pages:
+    """Pages through Strapi documents by page number.
+
+    Arguments:
+        get: Sends a request with the given query parameters.
+        params: Further query parameters, e.g. populate or status.
+        page_size: The number of documents per request.
+        prefetch: The number of pages fetched ahead.
+
+    Returns:
+        The pages.
+    """
+
+    def fetch_page(number: int, size: int) -> Page:
+        response = get(
+            {
+                **(params or {}),
+                "pagination[page]": number + 1,
+                "pagination[pageSize]": size,
+            }
+        )
+        pagination = response.get("meta", {}).get("pagination", {})
+        records = response["data"]
+        if "pageCount" in pagination:
+            last = number + 1 >= pagination["pageCount"]
+        else:
+            last = len(records) < size
+        # Strapi caps the page size at its maxLimit.
+        size = pagination.get("pageSize", size)
+        return Page(records, pagination.get("total"), last, size)
+
+    return Pages(fetch_page, page_size, prefetch)
@@ -0,0 +1,125 @@
+from concurrent.futures import FIRST_COMPLETED, Future, ThreadPoolExecutor, wait
+from typing import Callable, Hashable, Iterable
+
+from .client import MAX_CONCURRENCY
+
+TaskKey = Hashable
+
+
+class Scheduler:
+    """Runs tasks that depend on the results of other tasks, e.g. writes
+    that need the IDs of documents created by earlier writes. Every task
+    starts as soon as all its dependencies have finished, rather than
+    after all tasks of an earlier phase, and at most max_workers tasks
+    run at once.
+    """
+
+    def __init__(self, max_workers: int = MAX_CONCURRENCY):
+        """Creates a scheduler without tasks.
+
+        Arguments:
+            max_workers: The number of tasks run at once.
+        """
+        self.max_workers = max_workers
+        self.tasks: dict[TaskKey, Callable[[dict], object]] = {}
+        self.dependencies: dict[TaskKey, tuple[TaskKey, ...]] = {}
+
+    def add(
+        self,
+        key: TaskKey,
+        func: Callable[[dict], object],
+        dependencies: Iterable[TaskKey] = (),
+    ):
+        """Adds a task. Dependencies have to be added first, which rules
+        out cycles.
+
+        Arguments:
+            key: Identifies the task, e.g. ("material-groups", 12).
+            func: Runs the task. It is called with the results of the
+                dependencies by their keys.
+            dependencies: The keys of the tasks whose results it needs.
+        """
+        if key in self.tasks:
+            raise ValueError(f"Task {key!r} was already added")
+        dependencies = tuple(dict.fromkeys(dependencies))
+        unknown = [
+            dependency for dependency in dependencies if dependency not in self.tasks
+        ]
+        if unknown:
+            raise ValueError(f"Task {key!r} depends on unknown tasks {unknown!r}")
+        self.tasks[key] = func
+        self.dependencies[key] = dependencies
+
+    def run(
+        self, on_error: Callable[[TaskKey, Exception], None] | None = None
+    ) -> dict[TaskKey, object]:
+        """Runs all tasks.
+
+        Arguments:
+            on_error: Called for every task that raised an exception. The
+                tasks that depend on it, directly or not, are skipped.
+                Without it, no further tasks are started after the first
+                exception, which is raised once the running tasks have
+                finished.
+
+        Returns:
+            The results of the tasks that ran, by their keys.
+        """
+        waiting_on = {key: len(deps) for key, deps in self.dependencies.items()}
+        dependents = {key: [] for key in self.tasks}
+        for key, deps in self.dependencies.items():
+            for dependency in deps:
+                dependents[dependency].append(key)
+
+        results = {}
+        failed = set()
+        error = None
+
+        def skip(key: TaskKey):
+            failed.add(key)
+            for dependent in dependents[key]:
+                if dependent not in failed:
+                    skip(dependent)
+
+        with ThreadPoolExecutor(max_workers=self.max_workers) as executor:
+            running: dict[Future, TaskKey] = {}
+
+            def start(key: TaskKey):
+                inputs = {
+                    dependency: results[dependency]
+                    for dependency in self.dependencies[key]
+                }
+                running[executor.submit(self.tasks[key], inputs)] = key
+
+            for key, count in waiting_on.items():
+                if count == 0:
+                    start(key)
+
+            while running:
+                done, _ = wait(running, return_when=FIRST_COMPLETED)
+                for future in done:
+                    key = running.pop(future)
+                    if future.cancelled():
+                        continue
+                    exception = future.exception()
+                    if exception is not None:
+                        if on_error is None:
+                            error = error or exception
+                            for queued in running:
+                                queued.cancel()
+                        else:
+                            on_error(key, exception)
+                        skip(key)
+                        continue
+
+                    results[key] = future.result()
+                    if error is not None:
+                        continue
+                    for dependent in dependents[key]:
+                        waiting_on[dependent] -= 1
+                        if waiting_on[dependent] == 0 and dependent not in failed:
+                            start(dependent)
+
+        if error is not None:
+            raise error
+        return results